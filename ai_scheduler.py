@@ -0,0 +1,140 @@
+from collections import deque
+import logging
+import time
+
+MOVE_CHANCE = 0.87
+NEAR_RADIUS = 10  # Rooms on each axis around the player where every enemy is simulated every turn
+TURN_BUDGET_MS = 4.0
+FRAME_BUDGET_MS = 2.0
+TIMING_WINDOW = 120
+MOVE_HISTORY = 256  # Turns of the player's move count kept for enemies walking the turns they missed
+
+
+def by_id(enemy):
+    # Sets of enemies are walked in a fixed order so a seeded game draws its random numbers the same way every run
+    return enemy.id
+
+
+class AIScheduler:
+    # Level-of-detail scheduling for EnemyManager. Enemies near the player or chasing it act every turn as
+    # before. The rest only wander, so they are simulated every few turns, further apart the further out they
+    # are, and then walk all the turns they missed in one go. Whatever does not fit in the turn's time budget
+    # waits in the ready queue and is worked off between frames
+    def __init__(self, manager):
+        self.perf_logger = logging.getLogger('perf')
+        self.manager = manager
+        self.turn = 0
+        self.last_turns = {}
+        self.next_due = {}
+        self.buckets = {}
+        self.ready = deque()
+        self.near = set()
+        self.timings = deque(maxlen=TIMING_WINDOW)
+        self.move_counts = deque(maxlen=MOVE_HISTORY)  # The manager's player_move_count at each recent turn
+        self.last_timing = {'turn': 0, 'ms': 0.0, 'near': 0, 'batched': 0, 'deferred': 0}
+
+    def add(self, enemy):
+        self.last_turns[enemy] = self.turn
+        self.schedule(enemy, self.turn + 1)
+
+    def remove(self, enemy):
+        self.last_turns.pop(enemy, None)
+        self.next_due.pop(enemy, None)
+        self.near.discard(enemy)
+
+    def interval(self, enemy):
+        # The player and the enemy close at two rooms a turn at most, so these gaps never let a far enemy
+        # skip past the aggro radius unsimulated
+        player = self.manager.player
+        distance = max(abs(enemy.x - player.x), abs(enemy.y - player.y))
+        if distance <= NEAR_RADIUS:
+            return 1
+        if distance <= NEAR_RADIUS * 2:
+            return 2
+        return 4
+
+    def schedule(self, enemy, turn):
+        self.next_due[enemy] = turn
+        self.buckets.setdefault(turn, []).append(enemy)
+
+    def run_turn(self):
+        start = time.perf_counter()
+        manager = self.manager
+        self.turn += 1
+        self.move_counts.append(manager.player_move_count)
+        manager.update_enemies_aggro()
+        player = manager.player
+        near = set(manager.spatial_index.within_box(player.x, player.y, NEAR_RADIUS)) | manager.aggro_enemies
+        for enemy in sorted(near, key=by_id):
+            self.next_due.pop(enemy, None)
+            owed = self.turn - self.last_turns[enemy]
+            if owed > 1:
+                self.catch_up(enemy, self.last_turns[enemy] + 1, self.turn - 1)
+            if manager.player_move_count % enemy.speed == 0 and manager.rng.random() < MOVE_CHANCE:
+                manager.move_enemy(enemy)
+            self.last_turns[enemy] = self.turn
+        for enemy in sorted(self.near - near, key=by_id):
+            if enemy in self.last_turns:
+                self.schedule(enemy, self.turn + self.interval(enemy))
+        self.near = near
+        for turn in [turn for turn in self.buckets if turn <= self.turn]:
+            self.ready.extend(self.buckets.pop(turn))
+        batched = self.work(start, TURN_BUDGET_MS)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.timings.append(elapsed)
+        self.last_timing = {'turn': self.turn, 'ms': round(elapsed, 3), 'near': len(near), 'batched': batched,
+                            'deferred': len(self.ready)}
+        self.perf_logger.debug(f"AI turn {self.turn}: {self.last_timing}")
+
+    def run_deferred(self):
+        # Called once a frame; spends at most the frame budget on enemies the last turn had no time for
+        if self.ready:
+            return self.work(time.perf_counter(), FRAME_BUDGET_MS)
+        return 0
+
+    def work(self, start, budget_ms):
+        deadline = start + budget_ms / 1000
+        done = 0
+        while self.ready and time.perf_counter() < deadline:
+            enemy = self.ready.popleft()
+            if self.next_due.get(enemy, self.turn + 1) > self.turn or enemy in self.near:
+                continue  # Removed, rescheduled since it was queued, or simulated every turn now
+            if self.last_turns[enemy] < self.turn:
+                self.catch_up(enemy, self.last_turns[enemy] + 1, self.turn)
+                self.last_turns[enemy] = self.turn
+            self.schedule(enemy, self.turn + self.interval(enemy))
+            done += 1
+        return done
+
+    def move_count_at(self, turn):
+        # Turns older than the history take the oldest count kept
+        back = min(self.turn - turn, len(self.move_counts) - 1)
+        return self.move_counts[-1 - back] if back >= 0 else self.manager.player_move_count
+
+    def catch_up(self, enemy, first_turn, last_turn):
+        # Wander for every turn owed, first_turn to last_turn, with the same speed and chance rules as a turn-by-turn
+        # enemy, each turn judged by the player's move count as it stood that turn. Reads the connection masks
+        # directly and updates the room and spatial index once at the end
+        manager = self.manager
+        game_map = manager.game_map
+        pathfinder = game_map.get_pathfinder()
+        masks, steps, size, rng = pathfinder.masks, pathfinder.steps, game_map.size, manager.rng
+        player_index = manager.player.y * size + manager.player.x
+        index = start = enemy.y * size + enemy.x
+        for turn in range(first_turn, last_turn + 1):
+            if self.move_count_at(turn) % enemy.speed or rng.random() >= MOVE_CHANCE:
+                continue
+            if index == player_index:
+                break
+            mask = masks[index]
+            options = [step for bit, step in steps if mask & bit]
+            if options:
+                index += rng.choice(options)
+        if index != start:
+            enemy.move_to_room(game_map.rooms[(index % size, index // size)])
+
+    def stats(self):
+        timings = self.timings
+        return dict(self.last_timing, tracked=len(self.last_turns),
+                    mean_ms=round(sum(timings) / len(timings), 3) if timings else 0.0,
+                    max_ms=round(max(timings), 3) if timings else 0.0)
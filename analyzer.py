@@ -1,4 +1,8 @@
+import argparse
 import json
+from lexicon import compile_lexicon, compiled_path, count_entries, validate
+import sys
+import time
 
 def analyze_json(file_path):
     with open(file_path, 'r') as file:
@@ -33,6 +37,42 @@ def print_sorted_locations(locations):
     for location, details in sorted_locations:
         print(f"{location}: {details['total_zones']} zones")
 
-# Example usage
-file_path = 'words.json'
-analyze_json(file_path)
\ No newline at end of file
+def check_json(file_path):
+    with open(file_path, 'r') as file:
+        data = json.load(file)
+    errors = validate(data)
+    for error in errors:
+        print(f"Schema error: {error}")
+    if not errors:
+        print_counts(count_entries(data))
+    return not errors
+
+def print_counts(counts):
+    print("Entry counts:")
+    for key, count in counts.items():
+        print(f"  {key}: {count}")
+
+def compile_json(file_path, output_file):
+    start = time.perf_counter()
+    try:
+        counts = compile_lexicon(file_path, output_file)
+    except ValueError as error:
+        print(error)
+        return False
+    print_counts(counts)
+    print(f"Compiled {file_path} into {output_file or compiled_path(file_path)} in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect, validate and compile the game's word lists.")
+    parser.add_argument('file_path', nargs='?', default='words.json')
+    parser.add_argument('--check', action='store_true', help="validate the schema and report entry counts")
+    parser.add_argument('--compile', nargs='?', const='', default=None, metavar='OUTPUT',
+                        help="validate and write the binary lexicon the game loads at startup (default: words.bin)")
+    args = parser.parse_args()
+    if args.compile is not None:
+        sys.exit(0 if compile_json(args.file_path, args.compile or None) else 1)
+    elif args.check:
+        sys.exit(0 if check_json(args.file_path) else 1)
+    else:
+        analyze_json(args.file_path)
\ No newline at end of file
@@ -0,0 +1,180 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import combat_rules
+import json
+import multiprocessing
+import numpy as np
+from number_ranges import parse_ranges
+import os
+from progression import ENEMY_STAT_TABLES, PLAYER_STAT_CURVES, PLAYER_STAT_TABLES, determine_enemy_level
+import sys
+import time
+
+MAX_ROUNDS = 500  # Fights where neither side can hurt the other are called a draw here
+ROUNDS_HISTOGRAM = MAX_ROUNDS + 1
+BASE_PLAYER_STATS = {'hp': 20, 'mp': 10, 'atk': 10, 'defn': 10, 'int': 10, 'wis': 10, 'con': 10, 'eva': 10}
+ENEMY_ROLLS = {'max_hp': (25, 25), 'max_mp': (10, 10), 'atk': (5, 10), 'defn': (5, 10),
+               'int': (5, 10), 'wis': (5, 10), 'con': (5, 10), 'eva': (5, 10)}
+FIGHT_STATS = ('hp', 'atk', 'defn', 'eva', 'int', 'wis')
+
+
+def level_offset_weights():
+    # Share of spawns at each level offset, read off determine_enemy_level itself for every roll of randint(0, 100)
+    offsets = [determine_enemy_level(indicator, 0) for indicator in range(combat_rules.ROLL_MAX + 1)]
+    return {offset: offsets.count(offset) / len(offsets) for offset in sorted(set(offsets))}
+
+
+def player_stats(level, count, rng):
+    # A fresh player at level, grown one level-up at a time like Player.level_up, random jitter included
+    stats = {stat: np.full(count, value, dtype=np.int64) for stat, value in BASE_PLAYER_STATS.items()}
+    for lvl in range(2, level + 1):
+        for stat in PLAYER_STAT_TABLES:
+            current = stats[stat]
+            increase = PLAYER_STAT_TABLES[stat][lvl] - current + rng.integers(1, 4, size=count)
+            stats[stat] = current + np.maximum(1, np.minimum(PLAYER_STAT_CURVES[stat][1] - current, increase))
+    return stats
+
+
+def enemy_stats(level, count, rng):
+    stats = {}
+    table_level = min(level, len(ENEMY_STAT_TABLES['atk']) - 1)
+    for stat, (low, high) in ENEMY_ROLLS.items():
+        stats[stat] = np.maximum(rng.integers(low, high + 1, size=count), ENEMY_STAT_TABLES[stat][table_level])
+    stats['hp'] = stats['max_hp'].copy()
+    return stats
+
+
+def attack(attacker, defender, rng, player_attacking):
+    # One Combat.attack for every fight in the batch; returns the damage dealt. The player always starts the
+    # fight in the game, so critical hits count for both sides
+    count = len(defender['hp'])
+    if player_attacking:
+        luck = rng.random(count) <= combat_rules.LUCK_CHANCE
+        boosted = {stat: np.where(luck, combat_rules.lucky(attacker[stat]), attacker[stat]) for stat in combat_rules.LUCKY_STATS}
+    else:
+        luck = np.zeros(count, dtype=bool)
+        boosted = attacker
+    hit = rng.integers(0, combat_rules.ROLL_MAX + 1, size=count) <= combat_rules.hit_chance(boosted['int'], defender['eva'])
+    dodged = hit & (rng.integers(0, combat_rules.ROLL_MAX + 1, size=count) <= combat_rules.DODGE_CHANCE)
+    variance = rng.uniform(combat_rules.VARIANCE_LOW, combat_rules.VARIANCE_HIGH, size=(2, count))
+    dealt = combat_rules.damage(boosted['atk'], defender['defn'], variance[0], variance[1])
+    critical = rng.integers(0, combat_rules.ROLL_MAX + 1, size=count) < combat_rules.critical_chance(boosted['wis'], defender['wis'])
+    dealt = np.where(critical, combat_rules.critical_damage(dealt, rng.random(count)), dealt)
+    dealt = np.where(hit & ~dodged, dealt, 0)
+    if player_attacking:
+        # Combat.attack returns on a dodge before it puts the lucky stats back, so they stay for the rest of the fight
+        kept = luck & dodged
+        for stat in combat_rules.LUCKY_STATS:
+            attacker[stat] = np.where(kept, boosted[stat], attacker[stat])
+    defender['hp'] = defender['hp'] - dealt
+    return dealt
+
+
+def take(stats, keep):
+    return {stat: values[keep] for stat, values in stats.items()}
+
+
+def simulate_fights(level, offset, count, seed):
+    # Runs count fights to the end, shrinking the batch as fights finish. Returns win, loss and draw counts
+    # plus histograms of the player's attacks needed to win and survived before losing
+    rng = np.random.default_rng([seed, level, offset])
+    player = player_stats(level, count, rng)
+    enemy = enemy_stats(level + offset, count, rng)
+    player = {stat: player[stat] for stat in FIGHT_STATS}
+    enemy = {stat: enemy[stat] for stat in FIGHT_STATS}
+    won_rounds = np.zeros(ROUNDS_HISTOGRAM, dtype=np.int64)
+    lost_rounds = np.zeros(ROUNDS_HISTOGRAM, dtype=np.int64)
+    wins = losses = 0
+    for round_number in range(1, MAX_ROUNDS + 1):
+        if not len(player['hp']):
+            break
+        attack(player, enemy, rng, True)
+        won = enemy['hp'] <= 0
+        wins += int(won.sum())
+        won_rounds[round_number] += int(won.sum())
+        player, enemy = take(player, ~won), take(enemy, ~won)
+        attack(enemy, player, rng, False)
+        lost = player['hp'] <= 0
+        losses += int(lost.sum())
+        lost_rounds[round_number] += int(lost.sum())
+        player, enemy = take(player, ~lost), take(enemy, ~lost)
+    return {'level': level, 'offset': offset, 'fights': count, 'wins': wins, 'losses': losses,
+            'draws': count - wins - losses, 'won_rounds': won_rounds, 'lost_rounds': lost_rounds}
+
+
+def merge(results):
+    cells = {}
+    for result in results:
+        key = (result['level'], result['offset'])
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = dict(result)
+            continue
+        for field in ('fights', 'wins', 'losses', 'draws', 'won_rounds', 'lost_rounds'):
+            cell[field] = cell[field] + result[field]
+    return cells
+
+
+def histogram_median(histogram):
+    total = histogram.sum()
+    if not total:
+        return None
+    return int(np.searchsorted(np.cumsum(histogram), (total + 1) / 2))
+
+
+def summarise(cell):
+    rounds = np.arange(ROUNDS_HISTOGRAM)
+    won = cell['won_rounds']
+    return {'level': cell['level'], 'offset': cell['offset'], 'fights': int(cell['fights']),
+            'win_rate': round(cell['wins'] / cell['fights'], 4), 'draw_rate': round(cell['draws'] / cell['fights'], 4),
+            'rounds_to_kill_mean': round(float((won * rounds).sum() / won.sum()), 2) if won.sum() else None,
+            'rounds_to_kill_median': histogram_median(won),
+            'rounds_to_lose_median': histogram_median(cell['lost_rounds'])}
+
+
+def run_simulation(levels, offsets, fights, batch_size, seed, workers):
+    # Each level and offset is split into batches seeded by their position, so results do not depend on workers
+    jobs = [(level, offset, min(batch_size, fights - start), seed * 1000003 + start)
+            for level in levels for offset in offsets for start in range(0, fights, batch_size)]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        results = list(executor.map(simulate_fights, *zip(*jobs)))
+    return [summarise(cell) for _, cell in sorted(merge(results).items())]
+
+
+def print_tables(rows, offsets, weights, file):
+    levels = sorted({row['level'] for row in rows})
+    cells = {(row['level'], row['offset']): row for row in rows}
+    for title, field, fmt in (("Win rate", 'win_rate', "{:8.1%}"), ("Median rounds to kill", 'rounds_to_kill_median', "{:>8}")):
+        print(f"{title} by player level and enemy level offset", file=file)
+        print("level " + "".join(f"{'+' + str(offset):>8}" for offset in offsets) + ("    spawn" if field == 'win_rate' else ""), file=file)
+        for level in levels:
+            values = [cells[(level, offset)][field] for offset in offsets]
+            line = f"{level:>5} " + "".join(fmt.format(value) if value is not None else f"{'-':>8}" for value in values)
+            if field == 'win_rate':
+                # Expected win rate against an enemy drawn the way EnemyManager draws them
+                line += "{:9.1%}".format(sum(weights.get(offset, 0) * value for offset, value in zip(offsets, values)))
+            print(line, file=file)
+        print(file=file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Simulate player-versus-enemy fights headlessly to tabulate combat balance.")
+    parser.add_argument('--levels', nargs='+', default=['1-20'], help="player levels, or ranges like 1-100:5")
+    parser.add_argument('--offsets', nargs='+', type=int, default=sorted(level_offset_weights()))
+    parser.add_argument('--fights', type=int, default=100000, help="fights per player level and offset")
+    parser.add_argument('--batch', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--format', choices=('table', 'jsonl'), default='table')
+    args = parser.parse_args()
+    start = time.perf_counter()
+    rows = run_simulation(parse_ranges(args.levels), args.offsets, args.fights, args.batch, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    if args.format == 'jsonl':
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print_tables(rows, args.offsets, level_offset_weights(), sys.stdout)
+    total = sum(row['fights'] for row in rows)
+    print(f"{total} fights in {elapsed:.1f} s ({total / elapsed * 60:,.0f} per minute)", file=sys.stderr)
@@ -0,0 +1,114 @@
+import argparse
+from collections import deque
+from lexicon import get_lexicon
+import logging
+from map import Map
+from region_assignment import RegionAssignment
+import time
+
+
+class LegacyRegionAssignment:
+    # The region assignment as it was before the single-frontier partitioner, kept only to compare against
+    def __init__(self, map_instance, lexicon):
+        self.map = map_instance
+        self.locations = lexicon.locations
+        self.rng = self.map.stage_rng('regions')
+        self.remaining_zones = {region: data['total_zones'] for region, data in self.locations.items()}
+        self.assign_regions()
+        self.adjust_region_borders()
+        # MapElaborator used to run it a second time
+        self.assign_regions()
+
+    def assign_regions(self):
+        unassigned_rooms = set(self.map.rooms.keys())
+        shuffled_regions = list(self.locations.items())
+        self.rng.shuffle(shuffled_regions)
+        for region, data in shuffled_regions:
+            if self.remaining_zones[region] > len(unassigned_rooms):
+                self.remaining_zones[region] = len(unassigned_rooms)
+            while unassigned_rooms and self.remaining_zones[region] > 0:
+                start_pos = self.rng.choice(list(unassigned_rooms))
+                grown_size = self.grow_region(start_pos, region, unassigned_rooms, self.remaining_zones[region])
+                self.remaining_zones[region] -= grown_size
+
+    def grow_region(self, start_pos, region, unassigned_rooms, max_size):
+        queue = deque([start_pos])
+        grown_size = 0
+        while queue and grown_size < max_size:
+            current_pos = queue.popleft()
+            if current_pos in unassigned_rooms:
+                room = self.map.rooms[current_pos]
+                room.region = region
+                room.name = self.rng.choice(self.locations[region]['zone_names'])
+                unassigned_rooms.remove(current_pos)
+                grown_size += 1
+                for neighbor_pos in self.get_adjacent_positions(current_pos):
+                    if neighbor_pos in unassigned_rooms:
+                        queue.append(neighbor_pos)
+        return grown_size
+
+    def adjust_region_borders(self):
+        unassigned_rooms = {pos for pos, room in self.map.rooms.items() if room.region is None}
+        iteration_count = 0
+        while unassigned_rooms:
+            for pos in list(unassigned_rooms):
+                self.adjust_room_region(pos, unassigned_rooms)
+            iteration_count += 1
+            if iteration_count > len(self.map.rooms):
+                break
+
+    def adjust_room_region(self, pos, unassigned_rooms):
+        best_region = None
+        max_neighbors = 0
+        for neighbor_pos in self.get_adjacent_positions(pos):
+            neighbor_room = self.map.rooms.get(neighbor_pos)
+            if neighbor_room and neighbor_room.region:
+                count = sum(1 for other_pos in self.get_adjacent_positions(neighbor_pos)
+                            if self.map.rooms.get(other_pos) and self.map.rooms[other_pos].region == neighbor_room.region)
+                if count > max_neighbors:
+                    max_neighbors = count
+                    best_region = neighbor_room.region
+        if best_region:
+            room = self.map.rooms[pos]
+            room.region = best_region
+            room.name = self.rng.choice(self.locations[best_region]['zone_names'])
+            unassigned_rooms.remove(pos)
+
+    def get_adjacent_positions(self, pos):
+        x, y = pos
+        return [(x + dx, y + dy) for dx, dy in ((0, -1), (0, 1), (1, 0), (-1, 0)) if (x + dx, y + dy) in self.map.rooms]
+
+
+def clear_regions(game_map):
+    for room in game_map.rooms.values():
+        room.region = None
+        room.name = ""
+
+
+def time_assignment(assignment_class, game_map, lexicon, repeats):
+    best = None
+    for _ in range(repeats):
+        clear_regions(game_map)
+        start = time.perf_counter()
+        assignment_class(game_map, lexicon)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    unassigned = sum(1 for room in game_map.rooms.values() if room.region is None)
+    return best, unassigned
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time the region partitioner against the previous implementation.")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[20, 50, 100, 200])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    lexicon = get_lexicon()
+    print(f"{'size':>6} {'rooms':>8} {'legacy ms':>12} {'partitioner ms':>15} {'speedup':>8} {'unassigned':>11}")
+    for size in args.sizes:
+        game_map = Map(size, seed=args.seed)
+        legacy_time, legacy_unassigned = time_assignment(LegacyRegionAssignment, game_map, lexicon, args.repeats)
+        new_time, new_unassigned = time_assignment(RegionAssignment, game_map, lexicon, args.repeats)
+        print(f"{size:>6} {len(game_map.rooms):>8} {legacy_time * 1000:>12.1f} {new_time * 1000:>15.1f} "
+              f"{legacy_time / new_time:>7.1f}x {legacy_unassigned:>5}/{new_unassigned:<5}")
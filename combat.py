@@ -1,9 +1,13 @@
+import combat_rules
 import logging
 import logging_config
 import pygame
 import random
 from sound_manager import SoundManager
 
+ROUND_DELAY_MS = 1500
+MUSIC_RESUME_DELAY_MS = 1000
+
 class Combat:
     logging_config.setup_logging()
     LIGHT_BLUE = (173, 216, 230)
@@ -12,7 +16,7 @@ class Combat:
     BRIGHT_RED = (255, 0, 0)
     ORANGE = (255, 165, 0)
 
-    def __init__(self, player, is_attacker, enemy_manager, message_display):
+    def __init__(self, player, is_attacker, enemy_manager, message_display, auto_resolve=False, round_delay=ROUND_DELAY_MS, seed=None):
         self.sounds = SoundManager()
         self.round_count = 0
         self.combat_logger = logging.getLogger('combat')
@@ -37,79 +41,59 @@ class Combat:
         self.turn = 'attacker'
         self.is_player_attacker = is_attacker
         self.player_won = False
+        self.enemy = self.defender if is_attacker else self.attacker
+        # Every fight is reproducible from its seed and the two stat snapshots taken here
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.combat_logger.info(f"Combat seed {self.seed}: {combat_rules.snapshot(player)} against {combat_rules.snapshot(self.enemy)}")
+        self.music_resume_time = None
+        self.round_log = None
+        self.replayed = 0
+        self.round_delay = ROUND_DELAY_MS
+        if auto_resolve:
+            # Settle the fight now and let update() play the log back at the chosen pace
+            self.round_log = combat_rules.resolve_combat(self.seed, combat_rules.snapshot(player), combat_rules.snapshot(self.enemy), is_attacker)[0]
+            self.round_delay = round_delay
         
     def attack(self, attacker, defender):
         self.combat_logger.debug(f"Starting attack: {attacker.name} attacking {defender.name}")
-        luck_attempt = random.random()
-        luck_chance = 0.20
-        luck_success = luck_attempt <= luck_chance
-        original_atk = attacker.atk
-        original_defn = attacker.defn
-        original_eva = attacker.eva
-        original_int = attacker.int
-        original_wis = attacker.wis
-        if attacker == self.player:
-            if luck_success:  # 20% chance of a luck boost
-                luck_boost = 1.33  # 33% increase in stats
-                attacker.atk = int(attacker.atk * luck_boost)
-                attacker.defn = int(attacker.defn * luck_boost)
-                attacker.eva = int(attacker.eva * luck_boost)
-                attacker.int = int(attacker.int * luck_boost)
-                attacker.wis = int(attacker.wis * luck_boost)
-                self.combat_logger.debug(f"Luck boost applied. Original stats: ATK={original_atk}, DEFN={original_defn}, EVA={original_eva}; New stats: ATK={attacker.atk}, DEFN={attacker.defn}, EVA={attacker.eva}")
-        critical_hit = False
-        if self.is_player_attacker:
-            hit_chance = max(10, min(100, 70 + attacker.int - int(2 * defender.eva / 3)))
-        hit_attempt = random.randint(0, 100)
-        hit = hit_attempt <= hit_chance
-        damage = 0 # so it's picked up in case of a miss
-        if hit:
-            self.combat_logger.debug(f'Hit successful, checking dodge.')
-            dodge_attempt = random.randint(0, 100)
-            dodge_chance = 10
-            if dodge_attempt <= dodge_chance:
-                dodge_message = f"* {defender.name} dodges the attack!"
-                self.message_display.add_message(dodge_message, self.DARK_BLUE if attacker == self.player else self.LIGHT_RED)
-                return 0, False  # No damage, no critical hit
-            attack_variance = random.uniform(0.8, 1.01)
-            defense_variance = random.uniform(0.8, 1.01)
-            calculated_damage = int((attacker.atk * attack_variance) - ((defender.defn * defense_variance) * 2 / 3))
-            damage = int(max(0, calculated_damage)) # damage
-            base_critical_chance = 10
-            critical_hit_chance = base_critical_chance + (attacker.wis - defender.wis) / 8
-            critical_attempt = random.randint(0, 100)
-            critical_hit = critical_attempt < critical_hit_chance
-            if critical_hit and self.is_player_attacker:
-                damage = int(damage*(2 + random.random()))
-                crit_message = f"* Critical hit by {attacker.name} doing {damage} damage!"
-                self.message_display.add_message(crit_message, self.DARK_BLUE if attacker == self.player else self.LIGHT_RED)
+        outcome, damage, lucky = combat_rules.resolve_attack(self.rng, combat_rules.snapshot(attacker), combat_rules.snapshot(defender),
+                                                             attacker == self.player, self.is_player_attacker)
+        self.apply_attack(attacker, defender, outcome, damage, lucky)
+
+    def apply_attack(self, attacker, defender, outcome, damage, lucky):
+        # Shared by live fights and replayed round logs, so both read and play out the same way
+        if lucky:
+            self.combat_logger.debug(f"Luck boost applied to {attacker.name}")
+        color = self.DARK_BLUE if attacker == self.player else self.LIGHT_RED
+        if outcome == combat_rules.MISS:
+            self.message_display.add_message(f"* {attacker.name} misses {defender.name}", color)
+        elif outcome == combat_rules.DODGE:
+            self.message_display.add_message(f"* {defender.name} dodges the attack!", color)
+            if lucky:
+                for stat in combat_rules.LUCKY_STATS:
+                    setattr(attacker, stat, int(combat_rules.lucky(getattr(attacker, stat))))
+            return
+        else:
+            self.combat_logger.debug(f'Hit successful for {damage} damage.')
+            if outcome == combat_rules.CRITICAL:
+                self.message_display.add_message(f"* Critical hit by {attacker.name} doing {damage} damage!", color)
+            elif damage == 0:
+                self.message_display.add_message(f"* {attacker.name} hits {defender.name}, but the attack is harmless.", color)
             else:
-                actual_damage = round(damage, 0)
-                print(f"Actual damage: {actual_damage}")
-                if actual_damage == 0:
-                    attack_message = f"* {attacker.name} hits {defender.name}, but the attack is harmless."
-                else:
-                    attack_message = f"* {attacker.name} hits {defender.name} for {damage} damage."
-                
-                self.message_display.add_message(attack_message, self.DARK_BLUE if attacker == self.player else self.LIGHT_RED)
-            defender.hp -= int(damage)
+                self.message_display.add_message(f"* {attacker.name} hits {defender.name} for {damage} damage.", color)
+            defender.hp -= damage
             self.sounds.play_sound('round', 0.6)
             if self.turn == 'attacker' and self.is_player_attacker:
                 self.player_damage += damage
-        else:
-            miss_message = f"* {attacker.name} misses {defender.name}"
-            self.message_display.add_message(miss_message, self.DARK_BLUE if attacker == self.player else self.LIGHT_RED)
         self.round_count += 1
-        attacker.atk = original_atk
-        attacker.defn = original_defn
-        attacker.eva = original_eva
-        attacker.int = original_int
-        attacker.wis = original_wis
 
     def update(self):
         current_time = pygame.time.get_ticks()
-        if current_time - self.last_update_time > 1500:
-            if self.turn == 'attacker':
+        if current_time - self.last_update_time > self.round_delay:
+            if self.round_log is not None:
+                self.replay_rounds()
+            elif self.turn == 'attacker':
                 self.attack(self.attacker, self.defender)
                 self.turn = 'defender'
             elif self.turn == 'defender':
@@ -118,6 +102,29 @@ class Combat:
             self.check_combat_end()
             self.last_update_time = current_time
 
+    def replay_rounds(self):
+        # With no delay the whole log plays out in one frame; otherwise one attack per round_delay
+        combatants = {combat_rules.PLAYER: self.player, combat_rules.ENEMY: self.enemy}
+        while self.replayed < len(self.round_log):
+            side, outcome, damage, lucky = self.round_log[self.replayed]
+            self.replayed += 1
+            self.turn = 'attacker' if combatants[side] == self.attacker else 'defender'
+            self.apply_attack(combatants[side], combatants[1 - side], outcome, damage, lucky)
+            if self.round_delay > 0:
+                break
+        if self.replayed == len(self.round_log) and self.attacker.hp > 0 and self.defender.hp > 0:
+            self.call_off()
+
+    def call_off(self):
+        # Nobody could land a blow, so the fight stops instead of running forever and nobody is beaten
+        self.combat_logger.info(f"Combat seed {self.seed} ended without a winner after {len(self.round_log)} attacks")
+        self.attacker.in_combat = False
+        self.defender.in_combat = False
+        self.message_display.add_message(f"* Neither side can wound the other; the fight is broken off.", self.ORANGE)
+        self.is_over = True
+        self.message_display.add_message(f"***** Exited Combat Mode *****", self.ORANGE)
+        self.resume_regular_music()
+
     def check_combat_end(self):
         if self.attacker.hp <= 0 or self.defender.hp <= 0:
             self.resolve_combat()
@@ -147,12 +154,11 @@ class Combat:
         if self.winner == self.player:
             defeated_enemy = self.defender if self.is_player_attacker else self.attacker
             self.message_display.add_message(f"* {self.player.name} has defeated {defeated_enemy.name}.")
-            if defeated_enemy in self.enemy_manager.enemies:
-                self.enemy_manager.enemies.remove(defeated_enemy)
+            self.enemy_manager.remove_enemy(defeated_enemy)
             if defeated_enemy in self.player.current_room.enemies:
-                self.player.current_room.enemies.remove(defeated_enemy)
+                self.player.current_room.remove_enemy(defeated_enemy)
             corpse_item = f"corpse ({defeated_enemy.name})"
-            self.player.current_room.decorations.append(corpse_item)
+            self.player.current_room.add_decoration(corpse_item)
             self.player.exp += defeated_enemy.exp
             self.message_display.add_message(f"* {self.player.name} gains {defeated_enemy.exp} experience.")
             
@@ -175,8 +181,13 @@ class Combat:
         pygame.mixer.music.set_volume(volume)
 
     def resume_regular_music(self):
-        pygame.time.wait(1000)
-        pygame.mixer.music.set_volume(0.3)
-        pygame.mixer.music.load('music/bgmusic.mp3')
-        pygame.mixer.music.play(-1)
+        # The pause before the music comes back no longer holds up the frame loop; update_music starts it
+        self.music_resume_time = pygame.time.get_ticks() + MUSIC_RESUME_DELAY_MS
+
+    def update_music(self):
+        if self.music_resume_time is not None and pygame.time.get_ticks() >= self.music_resume_time:
+            self.music_resume_time = None
+            pygame.mixer.music.set_volume(0.3)
+            pygame.mixer.music.load('music/bgmusic.mp3')
+            pygame.mixer.music.play(-1)
         
\ No newline at end of file
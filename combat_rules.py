@@ -0,0 +1,93 @@
+import numpy as np
+import random
+
+# The dice behind Combat.attack. Every formula takes plain ints or numpy arrays, so the game and the
+# balance simulator resolve attacks by the same rules
+LUCK_CHANCE = 0.20  # Only the player gets lucky
+LUCK_BOOST = 1.33
+LUCKY_STATS = ('atk', 'defn', 'eva', 'int', 'wis')
+ROLL_MAX = 100  # Percentile rolls are randint(0, 100), both ends included
+HIT_BASE = 70
+HIT_MIN = 10
+HIT_MAX = 100
+DODGE_CHANCE = 10
+VARIANCE_LOW = 0.8
+VARIANCE_HIGH = 1.01
+CRITICAL_BASE = 10
+CRITICAL_WIS_DIVISOR = 8
+
+
+def lucky(stat):
+    return np.floor(np.multiply(stat, LUCK_BOOST)).astype(np.int64)
+
+
+def hit_chance(attacker_int, defender_eva):
+    return np.clip(HIT_BASE + attacker_int - np.multiply(defender_eva, 2) // 3, HIT_MIN, HIT_MAX)
+
+
+def damage(attacker_atk, defender_defn, attack_variance, defense_variance):
+    # Defence counts for two thirds; the result is truncated like int(), then never below zero
+    raw = np.multiply(attacker_atk, attack_variance) - np.multiply(defender_defn, defense_variance) * 2 / 3
+    return np.maximum(0, np.trunc(raw)).astype(np.int64)
+
+
+def critical_chance(attacker_wis, defender_wis):
+    return CRITICAL_BASE + np.subtract(attacker_wis, defender_wis) / CRITICAL_WIS_DIVISOR
+
+
+def critical_damage(base_damage, roll):
+    # roll is uniform on [0, 1): a critical hit does two to three times the damage
+    return np.floor(np.multiply(base_damage, 2 + roll)).astype(np.int64)
+
+
+# Outcomes of one attack in a round log
+MISS, DODGE, HIT, CRITICAL = range(4)
+PLAYER, ENEMY = 0, 1
+SNAPSHOT_STATS = ('hp', 'atk', 'defn', 'eva', 'int', 'wis')
+MAX_ATTACKS = 1000  # A fight where neither side can do damage stops here with nobody beaten
+
+
+def snapshot(combatant):
+    return {stat: getattr(combatant, stat) for stat in SNAPSHOT_STATS}
+
+
+def resolve_attack(rng, attacker, defender, attacker_is_player, critical_hits=True):
+    # One attack, drawing from rng in exactly the order Combat.attack always has. Stats are snapshot dicts and
+    # are left alone; returns (outcome, damage, lucky)
+    lucky_roll = rng.random() <= LUCK_CHANCE and attacker_is_player
+    if lucky_roll:
+        attacker = dict(attacker, **{stat: int(lucky(attacker[stat])) for stat in LUCKY_STATS})
+    if rng.randint(0, ROLL_MAX) > int(hit_chance(attacker['int'], defender['eva'])):
+        return MISS, 0, lucky_roll
+    if rng.randint(0, ROLL_MAX) <= DODGE_CHANCE:
+        return DODGE, 0, lucky_roll
+    attack_variance = rng.uniform(VARIANCE_LOW, VARIANCE_HIGH)
+    defense_variance = rng.uniform(VARIANCE_LOW, VARIANCE_HIGH)
+    dealt = int(damage(attacker['atk'], defender['defn'], attack_variance, defense_variance))
+    if rng.randint(0, ROLL_MAX) < critical_chance(attacker['wis'], defender['wis']) and critical_hits:
+        return CRITICAL, int(critical_damage(dealt, rng.random())), lucky_roll
+    return HIT, dealt, lucky_roll
+
+
+def apply_attack(attacker, defender, outcome, dealt, lucky_roll):
+    # A dodged lucky attack never has its boost taken back, so the attacker keeps it
+    if outcome == DODGE and lucky_roll:
+        for stat in LUCKY_STATS:
+            attacker[stat] = int(lucky(attacker[stat]))
+    defender['hp'] -= dealt
+
+
+def resolve_combat(seed, player, enemy, player_attacks_first=True):
+    # The whole fight from one seed and two stat snapshots, with no side effects. The log holds one
+    # (side, outcome, damage, lucky) entry per attack; replaying it reproduces the fight exactly
+    rng = random.Random(seed)
+    stats = {PLAYER: dict(player), ENEMY: dict(enemy)}
+    side = PLAYER if player_attacks_first else ENEMY
+    rounds = []
+    while stats[PLAYER]['hp'] > 0 and stats[ENEMY]['hp'] > 0 and len(rounds) < MAX_ATTACKS:
+        attacker, defender = stats[side], stats[1 - side]
+        outcome, dealt, lucky_roll = resolve_attack(rng, attacker, defender, side == PLAYER, player_attacks_first)
+        apply_attack(attacker, defender, outcome, dealt, lucky_roll)
+        rounds.append((side, outcome, dealt, lucky_roll))
+        side = 1 - side
+    return rounds, stats[PLAYER]['hp'], stats[ENEMY]['hp']
@@ -1,20 +1,36 @@
+from ai_scheduler import AIScheduler
 from enemy import Enemy
-import json
-import random
+from lexicon import get_lexicon
+import logging
+import numpy as np
+from pathfinding import DistanceField
+from progression import determine_enemy_level
+from spatial_index import SpatialIndex
+
+CHASE_FIELD_RADIUS = 24  # Aggro starts five rooms out, so this covers all but the most winding chases
+AGGRO_RADIUS = 5
+SPAWN_CLEARANCE = 3  # Rooms on each axis kept clear around the player and every other enemy
 
 class EnemyManager:
     def __init__(self, game_map, player, player_move_count):
         self.name = ""
+        self.enemy_logger = logging.getLogger('sim')
         self.game_map = game_map
         self.player = player
+        self.rng = self.game_map.stage_rng('enemies')
         self.spawn_count = self.game_map.size // 3
         self.enemies = []
+        self.spatial_index = SpatialIndex()
+        self.aggro_enemies = set()
+        self.unplaced_spawns = 0
+        # One distance field rooted at the player serves every chasing enemy
+        self.player_field = DistanceField(self.game_map, CHASE_FIELD_RADIUS)
+        self.scheduler = AIScheduler(self)
         self.spawn_enemies(self.spawn_count, self.player.level)
         self.player_move_count = player_move_count
 
     def load_words(self):
-        with open('words.json') as file:
-            return json.load(file)
+        return get_lexicon()
 
     def check_chase_player(self):
         for enemy in self.enemies:
@@ -22,49 +38,72 @@ class EnemyManager:
                 enemy.is_following_player = True
 
     def spawn_enemies(self, count, player_level):
-        for num in range(count):
-            potential_start, level_indicator = None, None
-            for _ in range(100):  # Limit attempts to avoid infinite loop
-                potential_start = random.choice(list(self.game_map.rooms.values()))
-                if self.is_valid_spawn(potential_start):
-                    level_indicator = random.randint(0, 100)
-                    break
-            if not potential_start or level_indicator is None:
-                continue  # Skip if no valid location found
-            enemy_level = self.determine_enemy_level(level_indicator, player_level)
-            enemy = self.create_enemy(potential_start, enemy_level, num)
+        spawn_rooms = self.plan_spawn_rooms(count)
+        for num, start_room in enumerate(spawn_rooms):
+            level_indicator = self.rng.randint(0, 100)
+            enemy_level = determine_enemy_level(level_indicator, player_level)
+            enemy = self.create_enemy(start_room, enemy_level, num)
             self.enemies.append(enemy)
+            self.scheduler.add(enemy)
             print(f"Enemy generated: {enemy.get_stats()}")
+        self.unplaced_spawns = count - len(spawn_rooms)
+        if self.unplaced_spawns:
+            self.enemy_logger.warning(f"{self.unplaced_spawns} of {count} enemies could not be placed")
+        return self.unplaced_spawns
 
-    def determine_enemy_level(self, level_indicator, player_level):
-        if level_indicator < 6:
-            return player_level + 3
-        elif level_indicator < 17:
-            return player_level + 2
-        elif level_indicator < 33:
-            return player_level + 1
-        else:
-            return player_level
+    def plan_spawn_rooms(self, count):
+        # Dart throwing over one shuffled pass of the rooms: a room is taken unless an earlier pick, an existing
+        # enemy or the player has already blocked it, and each pick blocks the SPAWN_CLEARANCE box around it.
+        # Every room is looked at once at most, so the plan costs the same however full the map gets
+        size = self.game_map.size
+        blocked = np.zeros((size, size), dtype=bool)
+
+        def block(x, y):
+            blocked[max(0, y - SPAWN_CLEARANCE):y + SPAWN_CLEARANCE + 1, max(0, x - SPAWN_CLEARANCE):x + SPAWN_CLEARANCE + 1] = True
+        block(self.player.x, self.player.y)
+        for enemy in self.enemies:
+            block(enemy.x, enemy.y)
+        candidates = list(self.game_map.rooms.values())
+        self.rng.shuffle(candidates)
+        spawn_rooms = []
+        for room in candidates:
+            if len(spawn_rooms) == count:
+                break
+            if not blocked[room.y, room.x]:
+                spawn_rooms.append(room)
+                block(room.x, room.y)
+        return spawn_rooms
 
     def create_enemy(self, start_position, level, identifier):
         words = self.load_words()
-        adjective = random.choice(words['adjectives']['enemies']).title()
-        noun = random.choice(words['enemies']).title()
-        enemy = Enemy(start_position, level)
+        adjective = self.rng.choice(words['adjectives']['enemies']).title()
+        noun = self.rng.choice(words['enemies']).title()
+        enemy = Enemy(start_position, level, self.rng, self.spatial_index)
         enemy.id = identifier
         enemy.name = f"{adjective} {noun} ( level {level} )"
         return enemy
       
-    def is_valid_spawn(self, start_room):
-        for other in [self.player] + self.enemies:
-            if abs(start_room.x - other.x) <= 3 and abs(start_room.y - other.y) <= 3:
-                return False
-        return True
-    
+    def remove_enemy(self, enemy):
+        if enemy in self.enemies:
+            self.enemies.remove(enemy)
+        self.spatial_index.remove(enemy)
+        self.aggro_enemies.discard(enemy)
+        self.scheduler.remove(enemy)
+
+    def enemies_in_room(self, room):
+        return self.spatial_index.in_room(room.x, room.y)
+
+    def occupied_rooms(self):
+        return self.spatial_index.occupied_rooms()
+
     def update_enemies_aggro(self):
-        player_x, player_y = self.player.x, self.player.y
-        for enemy in self.enemies:
-            enemy.check_aggro(player_x, player_y)
+        # Only enemies near the player can change state: those that just came in range and those that left it
+        in_range = set(self.spatial_index.within_radius(self.player.x, self.player.y, AGGRO_RADIUS))
+        for enemy in self.aggro_enemies - in_range:
+            enemy.aggro = False
+        for enemy in in_range:
+            enemy.aggro = True
+        self.aggro_enemies = in_range
 
     def calculate_direction_towards_player(self, enemy, player):
         best_direction = None
@@ -81,29 +120,39 @@ class EnemyManager:
         return best_direction
   
     def move_enemies(self):
-        self.update_enemies_aggro()
-        for enemy in self.enemies:
-            if self.player_move_count % enemy.speed == 0:
-                if random.random() < 0.87:
-                    self.move_enemy(enemy)
+        self.scheduler.run_turn()
+
+    def run_deferred(self):
+        return self.scheduler.run_deferred()
+
+    def ai_timing(self):
+        return self.scheduler.stats()
 
     def move_enemy(self, enemy):
         if enemy.is_following_player:
             enemy.current_room == self.player.current_room
         elif enemy.aggro:
-            path = enemy.find_path_to_player(self.player, self.game_map)
-            next_room = enemy.next_move_on_path(path)
+            next_room = self.step_towards_player(enemy)
             if next_room:
-                enemy.current_room.enemy = None
                 enemy.move_to_room(next_room)
-                next_room.enemy = enemy
         else:
             if enemy.current_room != self.player.current_room:
                 valid_directions = [dir for dir in ['n', 's', 'e', 'w'] if enemy.can_move(dir, self.game_map)]
-                direction = random.choice(valid_directions) if valid_directions else None
+                direction = self.rng.choice(valid_directions) if valid_directions else None
 
                 if direction:
-                    enemy.current_room.enemy = None
                     new_room = self.game_map.rooms[(enemy.x, enemy.y)].connections[direction]
                     enemy.move_to_room(new_room)
-                    new_room.enemy = enemy
\ No newline at end of file
+
+    def step_towards_player(self, enemy):
+        size = self.game_map.size
+        player_room = self.player.current_room
+        # Only rebuilt when the player has moved since the last chasing enemy asked
+        self.player_field.update(player_room.y * size + player_room.x)
+        next_index = self.player_field.next_step(enemy.y * size + enemy.x)
+        if next_index is not None:
+            return self.game_map.rooms[(next_index % size, next_index // size)]
+        if enemy.current_room == player_room:
+            return None
+        # Too far round the maze for the field; the region planner handles the long way round
+        return enemy.next_move_on_path(self.game_map.get_region_planner().plan(enemy.current_room, player_room))
@@ -0,0 +1,83 @@
+import numpy as np
+
+
+class ExplorationTracker:
+    # Running totals for the stats panel. Explored rooms are bits in a bitset and light is totalled as it
+    # changes, overall and per region, so coverage is read off rather than summed over the map every frame.
+    # Behaves like the set of explored (x, y) positions it replaces
+    def __init__(self, game_map, max_light_level):
+        self.game_map = game_map
+        self.size = game_map.size
+        self.max_light_level = max_light_level
+        self.bits = bytearray((self.size * self.size + 7) // 8)
+        self.explored_count = 0
+        regions = game_map.rooms.region_names()
+        self.region_index = {region: index for index, region in enumerate(regions)}
+        self.regions = regions
+        # Region number of every cell, one past the end where there is no room, so bincount can drop it
+        self.cell_regions = np.full((self.size, self.size), len(regions), dtype=np.intp)
+        for room in game_map.rooms.values():
+            self.cell_regions[room.y, room.x] = self.region_index[room.region]
+        self.region_rooms = np.bincount(self.cell_regions.ravel(), minlength=len(regions) + 1)[:len(regions)]
+        self.region_explored = np.zeros(len(regions), dtype=np.int64)
+        self.max_lit = len(game_map.rooms) * max_light_level
+        self.newly_explored = []  # Positions added since the map was last drawn; the drawing clears it
+        self.recount()
+
+    def recount(self):
+        # Only for wholesale changes like revealing the map; everything else is tracked by its deltas
+        light = self.game_map.light
+        self.lit_total = int(light.sum())
+        self.region_lit = np.bincount(self.cell_regions.ravel(), weights=light.ravel(), minlength=len(self.regions) + 1)[:len(self.regions)].astype(np.int64)
+
+    def window_changed(self, rows, columns, before):
+        # before is what the window held until the light changed; only the difference goes into the totals
+        self.count_delta(self.cell_regions[rows, columns].ravel(), self.game_map.light[rows, columns].ravel(), before.ravel())
+
+    def cells_changed(self, indices, before):
+        self.count_delta(self.cell_regions.reshape(-1)[indices], self.game_map.light.reshape(-1)[indices], before)
+
+    def count_delta(self, regions, after, before):
+        delta = after.astype(np.int64) - before
+        if delta.any():
+            self.lit_total += int(delta.sum())
+            self.region_lit += np.bincount(regions, weights=delta, minlength=len(self.regions) + 1)[:len(self.regions)].astype(np.int64)
+
+    def add(self, position):
+        x, y = position
+        index = y * self.size + x
+        byte, bit = index >> 3, 1 << (index & 7)
+        if self.bits[byte] & bit:
+            return
+        self.bits[byte] |= bit
+        self.explored_count += 1
+        self.newly_explored.append(position)
+        region = self.cell_regions[y, x]
+        if region < len(self.regions):
+            self.region_explored[region] += 1
+
+    def __contains__(self, position):
+        x, y = position
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False
+        index = y * self.size + x
+        return bool(self.bits[index >> 3] & (1 << (index & 7)))
+
+    def __len__(self):
+        return self.explored_count
+
+    def percent_lit(self):
+        return round(100 * self.lit_total / self.max_lit, 2) if self.max_lit else 0.0
+
+    def percent_explored(self):
+        rooms = len(self.game_map.rooms)
+        return round(100 * self.explored_count / rooms, 2) if rooms else 0.0
+
+    def region_coverage(self, region):
+        index = self.region_index.get(region)
+        if index is None:
+            return None
+        rooms = int(self.region_rooms[index])
+        return {'rooms': rooms, 'explored': int(self.region_explored[index]),
+                'percent_explored': round(100 * int(self.region_explored[index]) / rooms, 2),
+                'percent_lit': round(100 * int(self.region_lit[index]) / (rooms * self.max_light_level), 2)}
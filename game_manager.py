@@ -1,6 +1,7 @@
 from enemy_manager import EnemyManager
+from horde_manager import HordeManager
+from level_pregenerator import LevelPregenerator
 import logging
-from map import Map
 from map_visualizer import MapVisualizer
 from player import Player
 import pygame
@@ -9,9 +10,17 @@ from sound_manager import SoundManager
 from ui import UI
 
 class GameManager:
-    def __init__(self, screen, width, height):
+    def __init__(self, screen, width, height, seed=None, horde=False, auto_resolve=False, combat_pace=0, field_of_view=False):
         self.level = 1
-        self.game_map = Map(self.get_map_size())
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.restarts = 0
+        self.horde = horde
+        self.auto_resolve = auto_resolve
+        self.combat_pace = combat_pace  # Milliseconds between replayed attacks when fights are auto-resolved
+        self.field_of_view = field_of_view  # Light follows connections rather than spreading in a disc
+        logging.getLogger('map').info(f"Game seed is {self.seed}")
+        self.level_pregenerator = LevelPregenerator()
+        self.game_map = self.level_pregenerator.take('level', self.get_map_size(), self.get_maze_generator(), self.get_map_seed())
         self.screen = screen
         self.width = width
         self.height = height
@@ -27,7 +36,8 @@ class GameManager:
         self.fullscreen = True
         start_room = random.choice(list(self.game_map.rooms.values()))
         self.player = Player(start_room, self)
-        self.enemy_manager = EnemyManager(self.game_map, self.player, self.player_move_count)
+        self.enemy_manager = self.create_enemy_manager()
+        self.game_map.memory_report([self.player])
         self.map_visualizer = MapVisualizer(self, self.game_map, self.player, self.width)
         self.map_visualizer.update_light_levels(self.player.visibility_radius)
         pygame.display.set_caption("The Lords of Chaos")
@@ -35,9 +45,32 @@ class GameManager:
         self.light_change = False
         self.ui = UI(self.screen, self.player, self.screen_width, self.screen_height, self)
         self.sounds = SoundManager()
+        self.pregenerate_maps()
 
-    def get_map_size(self):
-        return 12 + (self.level * 2)
+    def get_map_size(self, level=None):
+        level = self.level if level is None else level
+        return 12 + (level * 2)
+
+    def get_maze_generator(self, level=None):
+        # Each level cycles to a different maze style
+        level = self.level if level is None else level
+        return ('dfs', 'kruskal', 'wilson')[(level - 1) % 3]
+
+    def get_map_seed(self, level=None, restarts=None):
+        # Each level of each run gets its own seed, all derived from the game seed
+        level = self.level if level is None else level
+        restarts = self.restarts if restarts is None else restarts
+        return random.Random(f"{self.seed}:{level}:{restarts}").getrandbits(32)
+
+    def create_enemy_manager(self):
+        manager = HordeManager if self.horde else EnemyManager
+        return manager(self.game_map, self.player, self.player_move_count)
+
+    def pregenerate_maps(self):
+        # Build the next level and a spare restart map while this level is being played
+        next_level = self.level + 1
+        self.level_pregenerator.schedule('level', self.get_map_size(next_level), self.get_maze_generator(next_level), self.get_map_seed(next_level))
+        self.level_pregenerator.schedule('restart', self.get_map_size(), self.get_maze_generator(), self.get_map_seed(restarts=self.restarts + 1))
 
     def move_player(self, direction):
         if direction and self.player.can_move(direction, self.game_map):
@@ -49,7 +82,7 @@ class GameManager:
             self.player_move_count += 1
             new_room = self.game_map.rooms[(self.player.x, self.player.y)].connections[direction]
             self.player.move_to_room(new_room)
-            self.map_visualizer.explored.add((new_room.x, new_room.y))
+            self.map_visualizer.exploration.add((new_room.x, new_room.y))
             self.map_visualizer.update_light_levels(self.player.visibility_radius)
             self.sounds.play_sound('travel', 0.5)
             self.ui.message_display.add_message(f"Travelled {cardinal_direction} to {new_room.name.title()} ({new_room.x}, {new_room.y})")
@@ -63,20 +96,23 @@ class GameManager:
         # Reset the game map and enemies, clear inventory
         self.level += 1
         self.player.inventory.items = []
-        self.game_map = Map(self.get_map_size())
-        for room in self.game_map.rooms.values():
-            room.lit = 0
+        self.game_map = self.level_pregenerator.take('level', self.get_map_size(), self.get_maze_generator(), self.get_map_seed())
+        self.game_map.light.fill(0)
         start_room = random.choice(list(self.game_map.rooms.values()))
         self.player.current_room = start_room
         self.player_move_count = 0
-        self.enemy_manager = EnemyManager(self.game_map, self.player, self.player_move_count)
+        self.enemy_manager = self.create_enemy_manager()
         self.map_visualizer = MapVisualizer(self, self.game_map, self.player, self.width)
         self.map_visualizer.update_light_levels(self.player.visibility_radius)
         self.ui = UI(self.screen, self.player, self.screen_width, self.screen_height, self)
+        self.pregenerate_maps()
 
     def update(self):
         # Update game state for a single frame
         self.screen.fill((0, 0, 0))
+        self.enemy_manager.run_deferred()
+        if self.combat:
+            self.combat.update_music()
         self.ui.room_display.display_room_info(self.screen)
         self.ui.update_ui()
         self.map_area_x = self.screen_width // 2
@@ -93,16 +129,17 @@ class GameManager:
         }.get(direction, (0, 0))
     
     def restart_game(self):
-        self.game_map = Map(self.get_map_size())
-        for room in self.game_map.rooms.values():
-            room.lit = 0 
+        self.restarts += 1
+        self.game_map = self.level_pregenerator.take('restart', self.get_map_size(), self.get_maze_generator(), self.get_map_seed())
+        self.game_map.light.fill(0)
         start_room = random.choice(list(self.game_map.rooms.values()))
         self.player = Player(start_room, self)
         self.player_move_count = 0
-        self.enemy_manager = EnemyManager(self.game_map, self.player, self.player_move_count)
+        self.enemy_manager = self.create_enemy_manager()
         self.map_visualizer = MapVisualizer(self, self.game_map, self.player, self.width)
         self.map_visualizer.update_light_levels(self.player.visibility_radius)
         self.ui = UI(self.screen, self.player, self.screen_width, self.screen_height, self)
+        self.pregenerate_maps()
 
     def process_keypress(self, event):
         direction = None
@@ -117,9 +154,17 @@ class GameManager:
         elif event.key == pygame.K_SPACE:
             if self.ui.middle_button_label in ("Pick Up", "Attack"):
                 self.ui.handle_middle_button_click()
+        elif event.key == pygame.K_a:
+            self.auto_resolve = not self.auto_resolve
+            self.ui.message_display.add_message(f"Auto-resolve combat {'on' if self.auto_resolve else 'off'}.")
+        elif event.key == pygame.K_f:
+            self.field_of_view = not self.field_of_view
+            self.map_visualizer.update_light_levels(self.player.visibility_radius)
+            self.ui.message_display.add_message(f"Field of view {'follows connections' if self.field_of_view else 'is a disc'}.")
         elif event.key == pygame.K_q:
             self.sounds.play_sound('gameover', 0.75)
             pygame.time.wait(750)
+            self.level_pregenerator.shutdown()
             pygame.quit()
             exit(0)  # Quit the game
         if direction:
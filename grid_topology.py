@@ -0,0 +1,168 @@
+from collections.abc import MutableMapping
+import numpy as np
+
+DIRECTIONS = ('n', 's', 'e', 'w')
+DIRECTION_BITS = {'n': 1, 's': 2, 'e': 4, 'w': 8}
+DIRECTION_DELTAS = {'n': (0, -1), 's': (0, 1), 'e': (1, 0), 'w': (-1, 0)}
+OPPOSITES = {'n': 's', 's': 'n', 'e': 'w', 'w': 'e'}
+BIT_COUNTS = np.array([bin(mask).count('1') for mask in range(16)], dtype=np.uint8)
+
+
+class GridTopology:
+    # Arrays are indexed [y, x] like every other image-shaped grid in numpy
+    def __init__(self, size):
+        self.size = size
+        self.occupied = np.zeros((size, size), dtype=bool)
+        self.connections = np.zeros((size, size), dtype=np.uint8)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def add_room(self, x, y):
+        self.occupied[y, x] = True
+
+    def remove_room(self, x, y):
+        for direction in DIRECTIONS:
+            self.disconnect(x, y, direction)
+        self.occupied[y, x] = False
+
+    def connect(self, x, y, direction):
+        dx, dy = DIRECTION_DELTAS[direction]
+        self.connections[y, x] |= DIRECTION_BITS[direction]
+        self.connections[y + dy, x + dx] |= DIRECTION_BITS[OPPOSITES[direction]]
+
+    def disconnect(self, x, y, direction):
+        if not self.connections[y, x] & DIRECTION_BITS[direction]:
+            return
+        dx, dy = DIRECTION_DELTAS[direction]
+        self.connections[y, x] &= 15 ^ DIRECTION_BITS[direction]
+        self.connections[y + dy, x + dx] &= 15 ^ DIRECTION_BITS[OPPOSITES[direction]]
+
+    def is_connected(self, x, y, direction):
+        return bool(self.connections[y, x] & DIRECTION_BITS[direction])
+
+    def degrees(self):
+        return BIT_COUNTS[self.connections]
+
+    def dead_ends(self):
+        ys, xs = np.nonzero(self.degrees() == 1)
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def neighbor_masks(self):
+        # 4-bit mask of occupied grid neighbours, whether or not they are connected
+        masks = np.zeros((self.size, self.size), dtype=np.uint8)
+        occupied = self.occupied
+        masks[1:, :] |= np.where(occupied[:-1, :], DIRECTION_BITS['n'], 0).astype(np.uint8)
+        masks[:-1, :] |= np.where(occupied[1:, :], DIRECTION_BITS['s'], 0).astype(np.uint8)
+        masks[:, :-1] |= np.where(occupied[:, 1:], DIRECTION_BITS['e'], 0).astype(np.uint8)
+        masks[:, 1:] |= np.where(occupied[:, :-1], DIRECTION_BITS['w'], 0).astype(np.uint8)
+        masks[~occupied] = 0
+        return masks
+
+    def neighbor_mask(self, x, y):
+        mask = 0
+        for direction in DIRECTIONS:
+            dx, dy = DIRECTION_DELTAS[direction]
+            if self.in_bounds(x + dx, y + dy) and self.occupied[y + dy, x + dx]:
+                mask |= DIRECTION_BITS[direction]
+        return mask
+
+    def open_masks(self):
+        # Neighbours that exist but are not yet connected
+        return self.neighbor_masks() & ~self.connections
+
+    def component_labels(self):
+        # Hook-and-jump labelling: every room ends up pointing at the smallest index in its component
+        flat_connections = self.connections.ravel()
+        parent = np.arange(self.size * self.size, dtype=np.int64)
+        east = np.flatnonzero(flat_connections & DIRECTION_BITS['e'])
+        south = np.flatnonzero(flat_connections & DIRECTION_BITS['s'])
+        a = np.concatenate((east, south))
+        b = np.concatenate((east + 1, south + self.size))
+        while True:
+            root_a, root_b = parent[a], parent[b]
+            differs = root_a != root_b
+            if not differs.any():
+                break
+            np.minimum.at(parent, np.maximum(root_a, root_b)[differs], np.minimum(root_a, root_b)[differs])
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+        labels = parent.reshape(self.size, self.size)
+        return np.where(self.occupied, labels, -1)
+
+    def distances_from(self, x, y):
+        # Hop counts through connections, -1 where the start cannot reach
+        size = self.size
+        masks = self.connections.ravel().tolist()
+        steps = ((DIRECTION_BITS['n'], -size), (DIRECTION_BITS['s'], size), (DIRECTION_BITS['e'], 1), (DIRECTION_BITS['w'], -1))
+        distances = [-1] * (size * size)
+        start = y * size + x
+        distances[start] = 0
+        frontier = [start]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_frontier = []
+            for index in frontier:
+                mask = masks[index]
+                for bit, step in steps:
+                    if mask & bit and distances[index + step] < 0:
+                        distances[index + step] = distance
+                        next_frontier.append(index + step)
+            frontier = next_frontier
+        return np.array(distances, dtype=np.int32).reshape(size, size)
+
+    def component_count(self):
+        labels = self.component_labels()
+        return len(np.unique(labels[labels >= 0]))
+
+    def nbytes(self):
+        return self.occupied.nbytes + self.connections.nbytes
+
+
+class RoomConnections(MutableMapping):
+    # Dict-shaped view of one room's connection bits, resolving neighbours to Room objects on access
+    def __init__(self, room):
+        self.room = room
+
+    def __getitem__(self, direction):
+        if direction not in DIRECTION_BITS:
+            raise KeyError(direction)
+        room = self.room
+        if not room.map.topology.connections[room.y, room.x] & DIRECTION_BITS[direction]:
+            return None
+        dx, dy = DIRECTION_DELTAS[direction]
+        return room.map.rooms.get((room.x + dx, room.y + dy))
+
+    def mask(self):
+        return int(self.room.map.topology.connections[self.room.y, self.room.x])
+
+    def items(self):
+        # One array read for all four directions instead of four
+        mask, room = self.mask(), self.room
+        rooms = room.map.rooms
+        return [(direction, rooms.get((room.x + DIRECTION_DELTAS[direction][0], room.y + DIRECTION_DELTAS[direction][1]))
+                 if mask & DIRECTION_BITS[direction] else None) for direction in DIRECTIONS]
+
+    def values(self):
+        return [connected_room for _, connected_room in self.items()]
+
+    def __setitem__(self, direction, other_room):
+        if other_room is None:
+            self.room.map.topology.disconnect(self.room.x, self.room.y, direction)
+        else:
+            self.room.map.topology.connect(self.room.x, self.room.y, direction)
+        self.room.map.connection_edited(self.room.x, self.room.y, direction)
+
+    def __delitem__(self, direction):
+        self.room.map.topology.disconnect(self.room.x, self.room.y, direction)
+        self.room.map.connection_edited(self.room.x, self.room.y, direction)
+
+    def __iter__(self):
+        return iter(DIRECTIONS)
+
+    def __len__(self):
+        return len(DIRECTIONS)
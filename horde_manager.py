@@ -0,0 +1,257 @@
+from ai_scheduler import MOVE_CHANCE
+from enemy_manager import AGGRO_RADIUS, CHASE_FIELD_RADIUS, SPAWN_CLEARANCE
+from grid_topology import BIT_COUNTS, DIRECTION_BITS, DIRECTION_DELTAS, DIRECTIONS
+from lexicon import get_lexicon
+import logging
+import numpy as np
+from pathfinding import DistanceField
+from progression import ENEMY_STAT_TABLES, LEVEL_OFFSET_ROLLS
+import time
+
+HORDE_ENEMIES_PER_ROOM = 0.5
+# Stat: (lowest roll, highest roll) before levelling, as in Enemy.initialize_stats_to_level
+STAT_ROLLS = {'max_hp': (25, 25), 'max_mp': (10, 10), 'atk': (5, 10), 'defn': (5, 10),
+              'int': (5, 10), 'wis': (5, 10), 'con': (5, 10), 'eva': (5, 10)}
+STAT_FIELDS = tuple(STAT_ROLLS) + ('hp', 'mp', 'exp', 'level', 'speed')
+STAT_TABLES = {stat: np.array(table, dtype=np.int32) for stat, table in ENEMY_STAT_TABLES.items()}
+
+
+def build_direction_table():
+    # For every connection mask, the (dx, dy) of its first, second, ... open direction
+    table = np.zeros((16, 4, 2), dtype=np.int32)
+    for mask in range(16):
+        open_directions = [direction for direction in DIRECTIONS if mask & DIRECTION_BITS[direction]]
+        for choice, direction in enumerate(open_directions):
+            table[mask, choice] = DIRECTION_DELTAS[direction]
+    return table
+
+
+DIRECTION_TABLE = build_direction_table()
+
+
+class EnemyView:
+    # Stands in for an Enemy wherever one object is needed, combat and the room display, reading and writing
+    # the horde's arrays. Views are only made for enemies in the player's room
+    __slots__ = ('horde', 'slot', 'current_room', 'in_combat', 'is_following_player')
+
+    def __init__(self, horde, slot, room):
+        self.horde = horde
+        self.slot = slot
+        self.current_room = room
+        self.in_combat = False
+        self.is_following_player = False
+
+    @property
+    def id(self):
+        return self.slot
+
+    @property
+    def name(self):
+        return self.horde.enemy_name(self.slot)
+
+    @property
+    def x(self):
+        return int(self.horde.x[self.slot])
+
+    @property
+    def y(self):
+        return int(self.horde.y[self.slot])
+
+    @property
+    def aggro(self):
+        return bool(self.horde.aggro[self.slot])
+
+    def get_stats(self):
+        return {"name": self.name, "level": self.level, "atk": self.atk, "defn": self.defn, "int": self.int, "wis": self.wis,
+                "con": self.con, "eva": self.eva, "max_hp": self.max_hp, "max_mp": self.max_mp}
+
+
+def stat_property(field):
+    def getter(view):
+        return int(view.horde.stats[field][view.slot])
+
+    def setter(view, value):
+        view.horde.stats[field][view.slot] = value
+    return property(getter, setter)
+
+
+for field in STAT_FIELDS:
+    setattr(EnemyView, field, stat_property(field))
+
+
+class HordeManager:
+    # Struct-of-arrays stand-in for EnemyManager on horde levels. Every enemy is a slot in a set of numpy arrays
+    # and a turn is a handful of whole-array operations, so thousands of enemies move as cheaply as a few dozen
+    def __init__(self, game_map, player, player_move_count, spawn_count=None):
+        self.enemy_logger = logging.getLogger('sim')
+        self.game_map = game_map
+        self.player = player
+        self.size = game_map.size
+        self.rng = np.random.default_rng(self.game_map.stage_rng('enemies').getrandbits(64))
+        self.spawn_count = int(len(game_map.rooms) * HORDE_ENEMIES_PER_ROOM) if spawn_count is None else spawn_count
+        self.masks = game_map.topology.connections.ravel()
+        self.player_field = DistanceField(self.game_map, CHASE_FIELD_RADIUS)
+        self.field_distances = np.full(self.size * self.size, -1, dtype=np.int32)
+        self.field_members = np.zeros(0, dtype=np.int64)
+        lexicon = get_lexicon()
+        self.adjective_words = tuple(word.title() for word in lexicon['adjectives']['enemies'])
+        self.noun_words = tuple(word.title() for word in lexicon['enemies'])
+        self.views = {}
+        self.view_room = None
+        self.occupied = None
+        self.turn_ms = 0.0
+        self.spawn_enemies(self.spawn_count, self.player.level)
+        self.player_move_count = player_move_count
+
+    @property
+    def enemies(self):
+        return [self.view(slot) for slot in np.flatnonzero(self.alive).tolist()]
+
+    def spawn_enemies(self, count, player_level):
+        # Hordes are too dense to keep rooms clear around each other; only the player's surroundings stay empty
+        rooms = np.array([(room.x, room.y) for room in self.game_map.rooms.values()], dtype=np.int32)
+        clear = (np.abs(rooms[:, 0] - self.player.x) > SPAWN_CLEARANCE) | (np.abs(rooms[:, 1] - self.player.y) > SPAWN_CLEARANCE)
+        rooms = rooms[clear]
+        if not len(rooms):
+            count = 0
+        starts = rooms[self.rng.integers(len(rooms), size=count)] if count else np.zeros((0, 2), dtype=np.int32)
+        self.x = starts[:, 0].copy()
+        self.y = starts[:, 1].copy()
+        self.alive = np.ones(count, dtype=bool)
+        self.aggro = np.zeros(count, dtype=bool)
+        level = self.determine_enemy_levels(self.rng.integers(0, 101, size=count), player_level)
+        self.stats = {'level': level, 'speed': np.full(count, 2, dtype=np.int32),
+                      'exp': 25 * np.maximum(1, level // 3)}
+        table_levels = np.minimum(level, len(STAT_TABLES['atk']) - 1)
+        for field, (low, high) in STAT_ROLLS.items():
+            rolls = self.rng.integers(low, high + 1, size=count)
+            self.stats[field] = np.maximum(rolls, STAT_TABLES[field][table_levels]).astype(np.int32)
+        self.stats['hp'] = self.stats['max_hp'].copy()
+        self.stats['mp'] = self.stats['max_mp'].copy()
+        self.adjectives = self.rng.integers(len(self.adjective_words), size=count)
+        self.nouns = self.rng.integers(len(self.noun_words), size=count)
+        self.occupied = None
+        self.enemy_logger.info(f"Horde of {count} enemies spawned")
+        self.sync_views()
+
+    def determine_enemy_levels(self, level_indicators, player_level):
+        offsets = np.select([level_indicators < bound for bound, _ in LEVEL_OFFSET_ROLLS], [offset for _, offset in LEVEL_OFFSET_ROLLS], 0)
+        return np.maximum(player_level + offsets, 1).astype(np.int32)
+
+    def enemy_name(self, slot):
+        return f"{self.adjective_words[self.adjectives[slot]]} {self.noun_words[self.nouns[slot]]} ( level {self.stats['level'][slot]} )"
+
+    def view(self, slot):
+        view = self.views.get(slot)
+        if view is None:
+            view = self.views[slot] = EnemyView(self, slot, self.game_map.rooms[(int(self.x[slot]), int(self.y[slot]))])
+        return view
+
+    def sync_views(self):
+        # Only the player's room holds Enemy-like objects; everywhere else the arrays are the enemies
+        room = self.player.current_room
+        if self.view_room is not None and self.view_room is not room:
+            for view in list(self.view_room.enemies):
+                if isinstance(view, EnemyView):
+                    self.view_room.remove_enemy(view)
+        slots = np.flatnonzero(self.alive & (self.x == room.x) & (self.y == room.y)).tolist()
+        present = [view for view in room.enemies if isinstance(view, EnemyView)]
+        for view in present:
+            if view.slot not in slots:
+                room.remove_enemy(view)
+        present_slots = {view.slot for view in present}
+        for slot in slots:
+            view = self.view(slot)
+            view.current_room = room
+            if slot not in present_slots:
+                room.add_enemy(view)
+        # Views of enemies that have left the room are dropped unless something, like combat, still holds one
+        self.views = {slot: view for slot, view in self.views.items() if slot in slots or view.in_combat}
+        self.view_room = room
+
+    def remove_enemy(self, enemy):
+        self.alive[enemy.slot] = False
+        self.aggro[enemy.slot] = False
+        self.views.pop(enemy.slot, None)
+        self.occupied = None
+
+    def enemies_in_room(self, room):
+        if room == self.player.current_room:
+            self.sync_views()
+            return [view for view in room.enemies if isinstance(view, EnemyView)]
+        return [self.view(slot) for slot in np.flatnonzero(self.alive & (self.x == room.x) & (self.y == room.y)).tolist()]
+
+    def occupied_rooms(self):
+        if self.occupied is None:
+            indices = np.unique(self.y[self.alive] * self.size + self.x[self.alive])
+            self.occupied = {(index % self.size, index // self.size) for index in indices.tolist()}
+        return self.occupied
+
+    def update_enemies_aggro(self):
+        dx = self.x - self.player.x
+        dy = self.y - self.player.y
+        self.aggro = self.alive & (dx * dx + dy * dy <= AGGRO_RADIUS * AGGRO_RADIUS)
+
+    def move_enemies(self):
+        start = time.perf_counter()
+        self.update_enemies_aggro()
+        count = len(self.alive)
+        movers = self.alive & (self.player_move_count % self.stats['speed'] == 0) & (self.rng.random(count) < MOVE_CHANCE)
+        in_player_room = (self.x == self.player.x) & (self.y == self.player.y)
+        chasers = np.flatnonzero(movers & self.aggro & ~in_player_room)
+        wanderers = np.flatnonzero(movers & ~self.aggro & ~in_player_room)
+        self.chase(chasers)
+        self.wander(wanderers)
+        self.occupied = None
+        self.sync_views()
+        self.turn_ms = round((time.perf_counter() - start) * 1000, 3)
+
+    def run_deferred(self):
+        # Whole-array turns finish inside the keypress, so nothing is ever left over for later frames
+        return 0
+
+    def ai_timing(self):
+        return {'ms': self.turn_ms, 'near': int(self.aggro.sum()), 'batched': int(self.alive.sum()), 'deferred': 0}
+
+    def wander(self, slots):
+        # Each enemy takes one of its room's open directions, picked uniformly from the connection mask
+        masks = self.masks[self.y[slots] * self.size + self.x[slots]]
+        counts = BIT_COUNTS[masks]
+        movable = counts > 0
+        slots, masks, counts = slots[movable], masks[movable], counts[movable]
+        choices = (self.rng.random(len(slots)) * counts).astype(np.int32)
+        deltas = DIRECTION_TABLE[masks, choices]
+        self.x[slots] += deltas[:, 0]
+        self.y[slots] += deltas[:, 1]
+
+    def chase(self, slots):
+        if not len(slots):
+            return
+        size = self.size
+        player_room = self.player.current_room
+        if self.player_field.update(player_room.y * size + player_room.x):
+            # Only the rooms the old and new fields reached change, so the rest of the map is never touched
+            field = self.player_field
+            self.field_distances[self.field_members] = -1
+            self.field_members = np.array(field.members, dtype=np.int64)
+            distances = field.distances
+            self.field_distances[self.field_members] = [distances[index] for index in field.members]
+        distances = self.field_distances
+        indices = self.y[slots] * size + self.x[slots]
+        current = distances[indices]
+        masks = self.masks[indices]
+        next_indices = np.full(len(slots), -1, dtype=np.int64)
+        # Same downhill step DistanceField.next_step takes: the first direction, in n s e w order, one room closer
+        for bit, step in self.player_field.pathfinder.steps:
+            neighbors = np.where(masks & bit, indices + step, indices)
+            downhill = (masks & bit > 0) & (current > 0) & (distances[neighbors] == current - 1) & (next_indices < 0)
+            next_indices[downhill] = neighbors[downhill]
+        stepped = next_indices >= 0
+        self.x[slots[stepped]] = next_indices[stepped] % size
+        self.y[slots[stepped]] = next_indices[stepped] // size
+        # Rooms close as the crow flies but beyond the field are left to the region planner, one enemy at a time
+        planner = self.game_map.get_region_planner()
+        for slot in slots[~stepped & (current < 0)].tolist():
+            path = planner.plan(self.game_map.rooms[(int(self.x[slot]), int(self.y[slot]))], player_room)
+            if path:
+                self.x[slot], self.y[slot] = path[0].x, path[0].y
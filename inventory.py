@@ -12,7 +12,8 @@ class Inventory:
     def add_item(self, item):
         if len(self.items) < self.max_size:
             self.items.append(item)
-            self.player.current_room.decorations.remove(item)
+            self.player.current_room.remove_decoration(item)
+            self.game_manager.map_visualizer.room_items_changed(self.player.current_room)
             self.sounds.play_sound('inventory', 0.75)
             light_source_changed = False
             if item in ('reality amulet', 'reality statue', 'reality scroll', 'reality gemstone', 'reality relic'):
@@ -27,8 +28,7 @@ class Inventory:
                 self.player.visibility_radius = 5
                 light_source_changed = True
             if item == 'map':
-                for room in self.game_manager.game_map.rooms.values():
-                    room.lit = 5
+                self.game_manager.map_visualizer.reveal_map()
                 light_source_changed = True
             if item == 'compass':
                 self.game_manager.map_visualizer.draw_all_connections()
@@ -41,7 +41,8 @@ class Inventory:
     def remove_item(self, item):
         if item in self.items:
             self.items.remove(item)
-            self.player.current_room.decorations.append(item)
+            self.player.current_room.add_decoration(item)
+            self.game_manager.map_visualizer.room_items_changed(self.player.current_room)
             self.sounds.play_sound('inventory', 0.75)
             if item in ('lantern', 'torch', 'flashlight', 'glowing rock', 'table lamp'):
                 self.update_visibility_radius()
@@ -0,0 +1,66 @@
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import logging_config
+from map import Map
+from map_cache import MapCache
+import multiprocessing
+import time
+
+
+def build_map_snapshot(size, generator, seed):
+    start = time.perf_counter()
+    cache = MapCache()
+    snapshot = cache.load(size, generator, seed)
+    if snapshot is None:
+        snapshot = cache.store(Map(size, generator, seed))
+    return snapshot, time.perf_counter() - start
+
+
+class LevelPregenerator:
+    def __init__(self):
+        self.perf_logger = logging.getLogger('perf')
+        self.executor = None
+        self.cache = MapCache()
+        self.pending = {}
+
+    def get_executor(self):
+        if self.executor is None:
+            # Spawned rather than forked so the worker never inherits the pygame display or mixer
+            context = multiprocessing.get_context('spawn')
+            self.executor = ProcessPoolExecutor(max_workers=1, mp_context=context, initializer=logging_config.setup_worker_logging)
+        return self.executor
+
+    def schedule(self, slot, size, generator, seed):
+        pending = self.pending.get(slot)
+        if pending and pending[0] == (size, generator, seed):
+            return
+        if pending:
+            pending[1].cancel()
+        try:
+            future = self.get_executor().submit(build_map_snapshot, size, generator, seed)
+        except (OSError, RuntimeError) as error:
+            self.perf_logger.warning(f"Could not pregenerate the {slot} map: {error}")
+            return
+        self.pending[slot] = ((size, generator, seed), future)
+
+    def take(self, slot, size, generator, seed):
+        start = time.perf_counter()
+        pending = self.pending.pop(slot, None)
+        if pending and pending[0] == (size, generator, seed):
+            try:
+                snapshot, build_time = pending[1].result()
+                game_map = Map(size, generator, seed, snapshot=snapshot)
+                self.perf_logger.info(f"Swapped in pregenerated {slot} map (size {size}, {generator}, seed {seed}): ready in {build_time * 1000:.1f} ms, "
+                                      f"{len(snapshot)} bytes, swap took {(time.perf_counter() - start) * 1000:.1f} ms")
+                return game_map
+            except Exception as error:
+                self.perf_logger.warning(f"Pregenerated {slot} map failed, building it now instead: {error}")
+        game_map = self.cache.get_map(size, generator, seed)
+        self.perf_logger.info(f"Got {slot} map (size {size}, {generator}, seed {seed}) on the main thread in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return game_map
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
@@ -0,0 +1,223 @@
+import hashlib
+import json
+import logging
+import marshal
+import os
+import struct
+import sys
+from types import MappingProxyType
+
+WORDS_FILE = 'words.json'
+COMPILED_MAGIC = b'ASLEX'
+COMPILED_VERSION = 2
+# magic, compiled format version, source size, source mtime, source sha1
+COMPILED_HEADER = struct.Struct('<5sHQQ20s')
+OBJECT_CATEGORIES = ('furniture', 'tools', 'natural_elements', 'artifacts', 'wildlife', 'mystic_items', 'daily_life_items', 'weapons', 'armor')
+ADJECTIVE_CATEGORIES = ('colors', 'things', 'enemies')
+ITEM_CATEGORY_LETTERS = {'tools': 'T', 'weapons': 'W', 'armor': 'A', 'artifacts': 'K'}
+ROOM_TYPES = {
+    'urban': ("clockwork_city", "coastal_town", "farming_village", "suburban_neighborhood", "downtown_city", "haunted_mansion",
+              "cyberpunk_city", "steampunk_metropolis", "pirate_haven", "abandoned_city", "treetop_village", "frostbound_village"),
+    'outdoor': ("fiery_chasm", "nomadic_steppe", "frozen_wasteland", "volcanic_valley", "cursed_woods", "mirage_oasis",
+                "labyrinth_gardens", "pine_forest", "dense_jungle", "quiet_lake", "grassy_plains", "mountain_campsite", "forest"),
+    'magical': ("enchanted_forest", "crystal_caves", "mushroom_kingdom", "enchanted_valley", "crystal_canyon", "wizards_academy",
+                "dwarven_kingdom", "ancient_temple", "magical_menagerie")
+}
+
+lexicons = {}
+source_digests = {}
+
+
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, tuple):
+        # Compiled lexicons already hold tuples of strings; only nested mappings need wrapping
+        return value if not value or not isinstance(value[0], (dict, list)) else tuple(freeze(item) for item in value)
+    return value
+
+
+def room_type_for_region(region):
+    for room_type, regions in ROOM_TYPES.items():
+        if region in regions:
+            return room_type
+    return 'any'
+
+
+def item_category_table(objects):
+    # Walks the categories in file order so an item listed under two of them keeps the letter of the later one
+    return {item: ITEM_CATEGORY_LETTERS[category] for category, items in objects.items()
+            if category in ITEM_CATEGORY_LETTERS for item in items}
+
+
+def compiled_path(words_file):
+    return os.path.splitext(words_file)[0] + '.bin'
+
+
+def source_digest(words_file=WORDS_FILE):
+    stat = os.stat(words_file)
+    key = (words_file, stat.st_mtime_ns, stat.st_size)
+    if key not in source_digests:
+        with open(words_file, 'rb') as file:
+            source_digests[key] = hashlib.sha1(file.read()).digest()
+    return source_digests[key]
+
+
+def is_string_list(value):
+    return isinstance(value, list) and bool(value) and all(isinstance(item, str) for item in value)
+
+
+def validate(data):
+    errors = []
+    if not isinstance(data, dict):
+        return ["top level must be an object"]
+    for key, expected in (('locations', dict), ('objects', dict), ('adjectives', dict), ('atmos', list), ('enemies', list)):
+        if not isinstance(data.get(key), expected):
+            errors.append(f"'{key}' must be a{'n object' if expected is dict else ' list'}")
+    if errors:
+        return errors
+    for region, details in data['locations'].items():
+        if not isinstance(details, dict):
+            errors.append(f"locations.{region} must be an object")
+            continue
+        total_zones = details.get('total_zones')
+        if not isinstance(total_zones, int) or isinstance(total_zones, bool) or total_zones < 0:
+            errors.append(f"locations.{region}.total_zones must be a non-negative integer")
+        if not is_string_list(details.get('zone_names')):
+            errors.append(f"locations.{region}.zone_names must be a non-empty list of strings")
+    for section, required in (('objects', OBJECT_CATEGORIES), ('adjectives', ADJECTIVE_CATEGORIES)):
+        for category in required:
+            if category not in data[section]:
+                errors.append(f"{section}.{category} is missing")
+        for category, items in data[section].items():
+            if not is_string_list(items):
+                errors.append(f"{section}.{category} must be a non-empty list of strings")
+    for key in ('atmos', 'enemies'):
+        if not is_string_list(data[key]):
+            errors.append(f"'{key}' must be a non-empty list of strings")
+    return errors
+
+
+def count_entries(data):
+    counts = {'locations': len(data['locations']),
+              'zone_names': sum(len(details['zone_names']) for details in data['locations'].values()),
+              'total_zones': sum(details['total_zones'] for details in data['locations'].values())}
+    for section in ('objects', 'adjectives'):
+        for category, items in data[section].items():
+            counts[f"{section}.{category}"] = len(items)
+    counts['atmos'] = len(data['atmos'])
+    counts['enemies'] = len(data['enemies'])
+    return counts
+
+
+def encode_lexicon(data):
+    # Strings are interned before dumping so marshal writes each one once and references it after that,
+    # and loads them back already interned; the derived lookup tables are stored prebuilt alongside
+    def pack(value):
+        if isinstance(value, dict):
+            return {sys.intern(key): pack(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return tuple(pack(item) for item in value)
+        if isinstance(value, str):
+            return sys.intern(value)
+        return value
+
+    data = pack({key: data[key] for key in ('locations', 'objects', 'adjectives', 'atmos', 'enemies')})
+    payload = {
+        'version': COMPILED_VERSION,
+        'data': data,
+        'item_categories': {item: sys.intern(letter) for item, letter in item_category_table(data['objects']).items()},
+        'region_room_types': {region: sys.intern(room_type_for_region(region)) for region in data['locations']}
+    }
+    return marshal.dumps(payload)
+
+
+def decode_lexicon(blob):
+    payload = marshal.loads(blob)
+    if payload.get('version') != COMPILED_VERSION:
+        raise ValueError(f"Unsupported compiled lexicon version {payload.get('version')}, expected {COMPILED_VERSION}")
+    tables = {'item_categories': MappingProxyType(payload['item_categories']),
+              'region_room_types': MappingProxyType(payload['region_room_types'])}
+    return Lexicon(payload['data'], tables)
+
+
+def compile_lexicon(words_file=WORDS_FILE, output_file=None):
+    output_file = output_file or compiled_path(words_file)
+    with open(words_file, 'r') as file:
+        data = json.load(file)
+    errors = validate(data)
+    if errors:
+        raise ValueError(f"{words_file} failed validation: " + "; ".join(errors))
+    stat = os.stat(words_file)
+    header = COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, stat.st_size, stat.st_mtime_ns, source_digest(words_file))
+    temporary_path = f"{output_file}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as file:
+        file.write(header)
+        file.write(encode_lexicon(data))
+    os.replace(temporary_path, output_file)
+    return count_entries(data)
+
+
+def load_compiled(words_file=WORDS_FILE, compiled_file=None):
+    # Returns None when there is no usable artifact so the caller can fall back to the JSON
+    compiled_file = compiled_file or compiled_path(words_file)
+    boot_logger = logging.getLogger('boot')
+    try:
+        with open(compiled_file, 'rb') as file:
+            blob = file.read()
+    except OSError:
+        return None
+    magic, version, size, mtime, digest = COMPILED_HEADER.unpack_from(blob) if len(blob) >= COMPILED_HEADER.size else (None,) * 5
+    if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+        boot_logger.warning(f"Ignoring {compiled_file}: not a version {COMPILED_VERSION} compiled lexicon")
+        return None
+    try:
+        stat = os.stat(words_file)
+    except OSError:
+        stat = None
+    # Size and mtime are enough most of the time; a checkout that only touched the file is settled by the digest
+    if stat is not None and (stat.st_size, stat.st_mtime_ns) != (size, mtime) and source_digest(words_file) != digest:
+        boot_logger.info(f"{compiled_file} is stale, run 'python analyzer.py --compile' to rebuild it")
+        return None
+    try:
+        return decode_lexicon(blob[COMPILED_HEADER.size:])
+    except (ValueError, EOFError, TypeError, KeyError, IndexError) as error:
+        boot_logger.warning(f"Unreadable compiled lexicon {compiled_file}: {error}")
+        return None
+
+
+class Lexicon:
+    def __init__(self, data, tables=None):
+        # Everything handed out is read-only, so one parse can be shared by every map and every enemy
+        self.data = freeze(data)
+        self.locations = self.data['locations']
+        self.objects = self.data['objects']
+        self.adjectives = self.data['adjectives']
+        self.enemies = self.data['enemies']
+        self.atmos = self.data['atmos']
+        if tables is None:
+            tables = {'item_categories': MappingProxyType(item_category_table(self.objects)),
+                      'region_room_types': MappingProxyType({region: room_type_for_region(region) for region in self.locations})}
+        self.item_categories = tables['item_categories']
+        self.region_room_types = tables['region_room_types']
+        self.zone_names = MappingProxyType({region: details['zone_names'] for region, details in self.locations.items()})
+        self.zone_quotas = MappingProxyType({region: details['total_zones'] for region, details in self.locations.items()})
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+
+def get_lexicon(words_file=WORDS_FILE):
+    lexicon = lexicons.get(words_file)
+    if lexicon is None:
+        lexicon = load_compiled(words_file)
+        if lexicon is not None:
+            logging.getLogger('boot').debug(f"Loaded compiled lexicon for {words_file}")
+        else:
+            with open(words_file, 'r') as file:
+                lexicon = Lexicon(json.load(file))
+            logging.getLogger('boot').debug(f"Parsed {words_file}")
+        lexicons[words_file] = lexicon
+    return lexicon
@@ -0,0 +1,90 @@
+from lighting import MAX_LIGHT_LEVEL, apply_stencil, get_stencil, light_radius, stencil_bounds
+import numpy as np
+
+
+class LightEngine:
+    # Keeps the map's light as the brighter of two layers: what the player has lit on the way, which only
+    # ever rises, and the light of items lying in rooms, which goes when they are picked up. Every change
+    # touches only the window it can reach and returns what it changed, so running totals can follow
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self.size = game_map.size
+        self.light = game_map.light
+        self.occupied = game_map.topology.occupied
+        self.seen = game_map.light.copy()
+        self.field = np.zeros_like(self.light)
+        self.sources = {}  # Flat room index to the radii of the lights lying there
+        self.source_radius = np.zeros_like(self.light)  # Largest radius lying in each room, 0 for none
+        self.max_radius = 0
+        for room in game_map.rooms.values():
+            radii = self.room_radii(room)
+            if radii:
+                self.sources[room.y * self.size + room.x] = radii
+                self.source_radius[room.y, room.x] = max(radii)
+                self.max_radius = max(self.max_radius, max(radii))
+                for radius in radii:
+                    apply_stencil(self.field, self.occupied, room.x, room.y, get_stencil(radius))
+        np.maximum(self.light, self.field, out=self.light)
+
+    def room_radii(self, room):
+        return sorted(radius for radius in map(light_radius, room.decorations) if radius)
+
+    def stamp(self, x, y, stencil):
+        # The player's own light; returns the window it covers and the light there before
+        rows, columns = stencil_bounds(self.light.shape, x, y, stencil.shape[0] // 2)
+        before = self.light[rows, columns].copy()
+        apply_stencil(self.seen, self.occupied, x, y, stencil)
+        np.maximum(self.light[rows, columns], self.seen[rows, columns], out=self.light[rows, columns])
+        return rows, columns, before
+
+    def light_cells(self, indices, levels):
+        # The same for a scattered set of rooms, given as flat indices with no repeats
+        seen, light = self.seen.reshape(-1), self.light.reshape(-1)
+        before = light[indices].copy()
+        seen[indices] = np.maximum(seen[indices], levels)
+        light[indices] = np.maximum(before, levels)
+        return indices, before
+
+    def reveal(self):
+        self.seen[self.occupied] = MAX_LIGHT_LEVEL
+        self.light[self.occupied] = MAX_LIGHT_LEVEL
+
+    def room_changed(self, room):
+        # Call whenever items come or go in a room. Returns the window that changed and the light there before,
+        # or None when the room's lights are the same as they were
+        index = room.y * self.size + room.x
+        old, new = self.sources.get(index, []), self.room_radii(room)
+        if old == new:
+            return None
+        if new:
+            self.sources[index] = new
+        else:
+            del self.sources[index]
+        self.source_radius[room.y, room.x] = max(new, default=0)
+        self.max_radius = max(self.max_radius, max(new, default=0))
+        rows, columns = stencil_bounds(self.light.shape, room.x, room.y, max(old + new))
+        before = self.light[rows, columns].copy()
+        if set(old) <= set(new):
+            # Only brighter: stamp on top
+            for radius in new:
+                apply_stencil(self.field, self.occupied, room.x, room.y, get_stencil(radius))
+        else:
+            self.rebuild_field(rows, columns)
+        np.maximum(self.seen[rows, columns], self.field[rows, columns], out=self.light[rows, columns])
+        return rows, columns, before
+
+    def rebuild_field(self, rows, columns):
+        # Restamps, into a scratch grid around the window, every light close enough to reach into it
+        reach = self.max_radius
+        outer_rows = slice(max(0, rows.start - reach), min(self.size, rows.stop + reach))
+        outer_columns = slice(max(0, columns.start - reach), min(self.size, columns.stop + reach))
+        scratch = np.zeros((outer_rows.stop - outer_rows.start, outer_columns.stop - outer_columns.start), dtype=np.uint8)
+        occupied = self.occupied[outer_rows, outer_columns]
+        for y, x in zip(*np.nonzero(self.source_radius[outer_rows, outer_columns])):
+            for radius in self.sources[(y + outer_rows.start) * self.size + x + outer_columns.start]:
+                apply_stencil(scratch, occupied, x, y, get_stencil(radius))
+        self.field[rows, columns] = scratch[rows.start - outer_rows.start:rows.stop - outer_rows.start,
+                                            columns.start - outer_columns.start:columns.stop - outer_columns.start]
+
+    def stats(self):
+        return {'sources': len(self.sources), 'lit_by_sources': int(np.count_nonzero(self.field))}
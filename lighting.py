@@ -0,0 +1,51 @@
+import numpy as np
+
+MAX_LIGHT_LEVEL = 5
+LIGHT_RADII = (3, 4, 5)  # Bare-handed, then lantern or torch, then flashlight or glowing rock
+LIGHT_ITEM_RADII = {'lantern': 4, 'torch': 4, 'table lamp': 4, 'flashlight': 5, 'glowing rock': 5}
+DECORATION_LIGHT_RADII = {'candle': 2, 'red crystal': 2, 'blue crystal': 2}  # Decorations come with an adjective
+
+
+def build_stencil(radius):
+    # Light cast around the player's room: full light in it, a little less in the four rooms next to it for the
+    # two shorter radii, and a glimmer out to radius, measured as the crow flies
+    offsets = np.arange(-radius, radius + 1)
+    distances = np.hypot(offsets[np.newaxis, :], offsets[:, np.newaxis])
+    stencil = np.where(distances <= radius, 1, 0).astype(np.uint8)
+    if radius in (3, 4):
+        stencil[distances == 1] = radius - 1
+    stencil[radius, radius] = MAX_LIGHT_LEVEL
+    return stencil
+
+
+LIGHT_STENCILS = {radius: build_stencil(radius) for radius in LIGHT_RADII}
+
+
+def get_stencil(radius):
+    stencil = LIGHT_STENCILS.get(radius)
+    if stencil is None:
+        stencil = LIGHT_STENCILS[radius] = build_stencil(radius)
+    return stencil
+
+
+def light_radius(item):
+    # How far an item lying in a room lights around it, or None if it gives no light
+    radius = LIGHT_ITEM_RADII.get(item)
+    if radius is None:
+        radius = next((radius for name, radius in DECORATION_LIGHT_RADII.items() if item.endswith(' ' + name)), None)
+    return radius
+
+
+def stencil_bounds(shape, x, y, radius):
+    # The part of the grid a stencil centred on (x, y) covers, as row and column slices
+    size_y, size_x = shape
+    return slice(max(0, y - radius), min(size_y, y + radius + 1)), slice(max(0, x - radius), min(size_x, x + radius + 1))
+
+
+def apply_stencil(light, occupied, x, y, stencil):
+    # Raises light to at least the stencil centred on (x, y), clipped to the grid and to rooms that exist
+    radius = stencil.shape[0] // 2
+    rows, columns = stencil_bounds(light.shape, x, y, radius)
+    window = stencil[rows.start - (y - radius):rows.stop - (y - radius), columns.start - (x - radius):columns.stop - (x - radius)]
+    target = light[rows, columns]
+    np.maximum(target, window * occupied[rows, columns], out=target)
@@ -12,15 +12,22 @@ def setup_logging():
         'combat': {'filename': 'combat.log', 'level': logging.DEBUG},
         'boot': {'filename': 'boot.log', 'level': logging.DEBUG},
         'connector': {'filename': 'connector.log', 'level': logging.DEBUG},
-        'sim': {'filename': 'simulation.log', 'level': logging.DEBUG}
+        'sim': {'filename': 'simulation.log', 'level': logging.DEBUG},
+        'perf': {'filename': 'perf.log', 'level': logging.DEBUG}
     }
 
     for logger_name, logger_info in loggers.items():
         log_file = os.path.join(logs_dir, logger_info['filename'])
         setup_logger(logger_name, log_file, logger_info['level'])
 
-def setup_logger(name, log_file, level=logging.DEBUG):
-    handler = logging.FileHandler(log_file, mode='w')
+def setup_worker_logging():
+    # Worker processes share one appended log so they never truncate the game's own logs
+    log_file = os.path.join(logs_dir, 'worker.log')
+    for logger_name in ('map', 'connector', 'perf'):
+        setup_logger(logger_name, log_file, logging.INFO, mode='a')
+
+def setup_logger(name, log_file, level=logging.DEBUG, mode='w'):
+    handler = logging.FileHandler(log_file, mode=mode)
     formatter = logging.Formatter('%(message)s')
     handler.setFormatter(formatter)
 
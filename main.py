@@ -1,3 +1,4 @@
+import argparse
 import logging_config
 import pygame
 from title_screen import TitleScreen
@@ -6,6 +7,13 @@ from sound_manager import SoundManager
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="The Lords of Chaos")
+    parser.add_argument('--seed', type=int, help="replay the maps of an earlier game")
+    parser.add_argument('--horde', action='store_true', help="fill every level with a horde of enemies")
+    parser.add_argument('--auto-resolve', action='store_true', help="settle fights at once and replay them (toggle with a)")
+    parser.add_argument('--combat-pace', type=int, default=0, help="milliseconds between replayed attacks when auto-resolving")
+    parser.add_argument('--fov', action='store_true', help="light spreads through connections instead of a disc (toggle with f)")
+    args = parser.parse_args()
     logging_config.setup_logging()
     pygame.init()
     pygame.mixer.init()
@@ -15,7 +23,7 @@ if __name__ == "__main__":
     screen_width, screen_height = screen_info.current_w, screen_info.current_h
     screen = pygame.display.set_mode((0,0), pygame.FULLSCREEN)
     title_screen = TitleScreen(screen, screen_width, screen_height)
-    game_manager = GameManager(screen, screen_width, screen_height)
+    game_manager = GameManager(screen, screen_width, screen_height, args.seed, args.horde, args.auto_resolve, args.combat_pace, args.fov)
     fade_in_done = False
     title_screen.init_music(0.75)
     current_state = "title_screen"
@@ -48,6 +56,7 @@ if __name__ == "__main__":
         elif current_state == 'game_loop':
             for event in events:
                 if event.type == pygame.QUIT:
+                    game_manager.level_pregenerator.shutdown()
                     pygame.quit()
                     exit()
                 elif event.type == pygame.KEYDOWN:
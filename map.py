@@ -1,42 +1,99 @@
+from grid_topology import DIRECTION_DELTAS, GridTopology
+from light_engine import LightEngine
 import logging
+from map_codec import restore_map
 from map_elaborator import MapElaborator
+from maze_generators import create_generator
+import numpy as np
+from pathfinding import PathFinder
+from region_pathfinding import RegionPlanner
 import random
-from room import Room
+from room import RoomGrid
 from room_connector import RoomConnector
+import sys
+from visibility import VisibilityCache
+
+ROOM_MEMORY_BUDGET = 32  # bytes per room in the field and topology arrays; the string table is per map and reported apart
 
 class Map:
-    def __init__(self, size):
+    def __init__(self, size, generator='dfs', seed=None, snapshot=None):
         self.map_logger = logging.getLogger('map')
         self.size = size
-        self.rooms = {}
+        self.generator_name = generator
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.topology = GridTopology(size)
+        self.rooms = RoomGrid(self)
+        self.light = np.zeros((size, size), dtype=np.uint8)  # Light level of each room, [y, x] like the topology
         self.rooms_with_keys = []
-        self.generate_map()
-        MapElaborator(self, 'words.json')
+        self.room_connector = None
+        self.pathfinder = None
+        self.region_planner = None
+        self.visibility = None
+        self.light_engine = None
+        self.built = False  # Connections edited while generating are not reported; the caches come later
+        if snapshot is None:
+            self.map_logger.info(f"Generating a size {size} {generator} map from seed {self.seed}")
+            self.generate_map()
+            MapElaborator(self, 'words.json')
+        else:
+            # A map built elsewhere, e.g. by the level pregenerator, only needs unpacking
+            restore_map(self, snapshot)
+        self.built = True
+
+    def stage_rng(self, stage):
+        # Every generation stage draws from its own stream, so changing one stage never reshuffles the others
+        return random.Random(f"{self.seed}:{stage}")
+
+    def get_pathfinder(self):
+        if self.pathfinder is None:
+            self.pathfinder = PathFinder(self)
+        return self.pathfinder
+
+    def get_region_planner(self):
+        if self.region_planner is None:
+            self.region_planner = RegionPlanner(self)
+        return self.region_planner
+
+    def get_light_engine(self):
+        if self.light_engine is None:
+            self.light_engine = LightEngine(self)
+        return self.light_engine
+
+    def get_visibility(self):
+        if self.visibility is None:
+            self.visibility = VisibilityCache(self)
+        return self.visibility
+
+    def connection_edited(self, x, y, direction):
+        if not self.built:
+            return
+        dx, dy = DIRECTION_DELTAS[direction]
+        self.connections_changed([room for room in (self.rooms.get((x, y)), self.rooms.get((x + dx, y + dy))) if room])
+
+    def connections_changed(self, rooms):
+        # Anything that edits connections once the map is built reports the rooms here so the path caches follow
+        if self.pathfinder is not None:
+            self.pathfinder.refresh()
+        if self.region_planner is not None:
+            for region in {room.region for room in rooms}:
+                self.region_planner.invalidate_region(region)
+        if self.visibility is not None:
+            self.visibility.invalidate(rooms)
 
     def generate_map(self):
-        attempt = 0
-        max_attempts = 10
-        while attempt < max_attempts:
-            try:
-                self.populate_grid()
-                self.irregularize_outline()
-                self.visualize_map()
-                self.room_connector = RoomConnector(self)
-                break  # Exit loop if no assertion error
-            except AssertionError:
-                self.map_logger.error(f"Map generation failed on attempt {attempt + 1}. Retrying...")
-                self.rooms.clear()  # Clear the current map
-                attempt += 1
-        if attempt == max_attempts:
-            raise RuntimeError("Failed to generate a valid map after maximum attempts.")
+        self.populate_grid()
+        self.irregularize_outline()
+        self.room_connector = RoomConnector(self, create_generator(self.generator_name, self.stage_rng('maze')))
 
     def create_room(self, pos):
         room_id = len(self.rooms) + 1
-        room = Room(room_id, *pos, self)
-        self.rooms[pos] = room
+        room = self.rooms.add(*pos, room_id)
         self.map_logger.debug(f"Created room with ID: {room_id} at position {pos}")
         return room
 
+    def remove_room(self, pos):
+        return self.rooms.pop(pos, None)
+
     def reconnect_room(self, room):
         # Check all adjacent rooms and connect to the closest valid room
         for dx, dy in [(0, -1), (0, 1), (1, 0), (-1, 0)]:
@@ -46,6 +103,7 @@ class Map:
                 break  # Stop after connecting to one valid room
 
     def irregularize_outline(self):
+        self.outline_rng = self.stage_rng('outline')
         edges = [
             [(x, 0) for x in range(self.size)],
             [(x, self.size - 1) for x in range(self.size)],
@@ -61,14 +119,41 @@ class Map:
                 self.create_room((x, y))
 
     def remove_edge_segments(self, edge):
-        segment_length = random.randint(2, self.size // 4)  # Random segment length
+        segment_length = self.outline_rng.randint(2, self.size // 4)  # Random segment length
         start = 0
         while start < len(edge):
-            if random.random() < 0.5:  # 50% chance to remove a segment
+            if self.outline_rng.random() < 0.5:  # 50% chance to remove a segment
                 for pos in edge[start:start + segment_length]:
-                    self.rooms.pop(pos, None)
+                    self.remove_room(pos)
             start += segment_length
 
+    def memory_report(self, entities=()):
+        # Rooms themselves are views made on access, so a map costs its arrays plus the few item and enemy lists
+        room_bytes = self.rooms.nbytes()
+        string_bytes = self.rooms.string_bytes()
+        topology_bytes = self.topology.nbytes() + self.light.nbytes
+        entity_groups = {}
+        for entity in list({id(enemy): enemy for enemies in self.rooms.enemies.values() for enemy in enemies}.values()) + list(entities):
+            group = entity_groups.setdefault(type(entity).__name__, {'count': 0, 'bytes': 0})
+            group['count'] += 1
+            group['bytes'] += sys.getsizeof(entity)
+        for group in entity_groups.values():
+            group['bytes_each'] = round(group['bytes'] / group['count'], 1)
+        room_count = max(len(self.rooms), 1)
+        report = {
+            'rooms': len(self.rooms),
+            'room_bytes': room_bytes,
+            'string_bytes': string_bytes,
+            'topology_bytes': topology_bytes,
+            'bytes_per_room': round((room_bytes + topology_bytes) / room_count, 1),
+            'entities': entity_groups,
+            'total_bytes': room_bytes + string_bytes + topology_bytes + sum(group['bytes'] for group in entity_groups.values())
+        }
+        self.map_logger.info(f"Memory report: {report}")
+        if report['bytes_per_room'] > ROOM_MEMORY_BUDGET:
+            self.map_logger.warning(f"Rooms use {report['bytes_per_room']} bytes each, over the budget of {ROOM_MEMORY_BUDGET}")
+        return report
+
     def visualize_map(self):
         map_str = ''
         for y in range(self.size):
@@ -0,0 +1,128 @@
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import csv
+from itertools import combinations
+import json
+import logging_config
+from map import Map
+from maze_generators import GENERATORS
+import multiprocessing
+import numpy as np
+from number_ranges import parse_ranges
+import os
+import sys
+import time
+
+FIELDS = ('size', 'generator', 'seed', 'rooms', 'generation_ms', 'retries', 'joined_components', 'removed_rooms',
+          'forced_connections', 'dead_ends', 'regions', 'region_size_histogram', 'diameter',
+          'items', 'item_distance_min', 'item_distance_mean', 'item_distance_max')
+
+
+def region_size_histogram(game_map):
+    # Regions bucketed by size in powers of two: "1", "2-3", "4-7", ...
+    histogram = Counter()
+    for size in Counter(room.region for room in game_map.rooms.values()).values():
+        low = 1 << (size.bit_length() - 1)
+        histogram[str(low) if low == 1 else f"{low}-{low * 2 - 1}"] += 1
+    return dict(sorted(histogram.items(), key=lambda bucket: int(bucket[0].split('-')[0])))
+
+
+def farthest_room(topology, x, y):
+    distances = topology.distances_from(x, y)
+    index = int(np.argmax(distances))
+    return index % topology.size, index // topology.size, int(distances.flat[index])
+
+
+def map_statistics(game_map, generation_time):
+    topology = game_map.topology
+    connector = game_map.room_connector
+    # Double-sweep BFS: exact on a tree, a close lower bound once dead ends have been looped back
+    start = next(iter(game_map.rooms.values()))
+    x, y, _ = farthest_room(topology, start.x, start.y)
+    _, _, diameter = farthest_room(topology, x, y)
+    item_rooms = game_map.rooms_with_keys
+    distance_fields = [topology.distances_from(room.x, room.y) for room in item_rooms[:-1]]
+    item_distances = [int(distance_fields[a][item_rooms[b].y, item_rooms[b].x])
+                      for a, b in combinations(range(len(item_rooms)), 2)]
+    return {
+        'size': game_map.size,
+        'generator': game_map.generator_name,
+        'seed': game_map.seed,
+        'rooms': len(game_map.rooms),
+        'generation_ms': round(generation_time * 1000, 2),
+        # There is no retry loop in generation; this is how often the connector had to repair what the carver left
+        'retries': connector.joined_components + connector.removed_rooms,
+        'joined_components': connector.joined_components,
+        'removed_rooms': connector.removed_rooms,
+        'forced_connections': connector.generator.forced_connections,
+        'dead_ends': len(topology.dead_ends()),
+        'regions': len({room.region for room in game_map.rooms.values()}),
+        'region_size_histogram': region_size_histogram(game_map),
+        'diameter': diameter,
+        'items': len(item_rooms),
+        'item_distance_min': min(item_distances, default=None),
+        'item_distance_mean': round(sum(item_distances) / len(item_distances), 2) if item_distances else None,
+        'item_distance_max': max(item_distances, default=None)
+    }
+
+
+def generate_and_measure(size, generator, seed):
+    start = time.perf_counter()
+    game_map = Map(size, generator, seed)
+    return map_statistics(game_map, time.perf_counter() - start)
+
+
+class RecordWriter:
+    def __init__(self, file, output_format):
+        self.file = file
+        self.output_format = output_format
+        if output_format == 'csv':
+            self.writer = csv.DictWriter(file, fieldnames=FIELDS)
+            self.writer.writeheader()
+
+    def write(self, record):
+        if self.output_format == 'csv':
+            self.writer.writerow({key: json.dumps(value) if isinstance(value, dict) else value for key, value in record.items()})
+        else:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+
+def run_batch(jobs, writer, workers):
+    failures = 0
+    # Spawned like the level pregenerator so workers start clean on every platform
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=logging_config.setup_worker_logging) as executor:
+        futures = {executor.submit(generate_and_measure, *job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            size, generator, seed = futures[future]
+            try:
+                writer.write(future.result())
+            except Exception as error:
+                failures += 1
+                print(f"Map size {size} {generator} seed {seed} failed: {error!r}", file=sys.stderr)
+            if done % 100 == 0 or done == len(futures):
+                print(f"{done}/{len(futures)} maps", file=sys.stderr)
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate maps headlessly in parallel and record quality statistics.")
+    parser.add_argument('--sizes', nargs='+', default=['20'], help="map sizes, or ranges like 20-60:10")
+    parser.add_argument('--generators', nargs='+', default=['dfs'], choices=sorted(GENERATORS))
+    parser.add_argument('--seeds', type=int, default=100, help="number of seeds per size and generator")
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    parser.add_argument('--output', help="file to write, standard output if omitted")
+    args = parser.parse_args()
+    jobs = [(size, generator, seed) for size in parse_ranges(args.sizes) for generator in args.generators
+            for seed in range(args.first_seed, args.first_seed + args.seeds)]
+    output = open(args.output, 'w', newline='') if args.output else sys.stdout
+    try:
+        failures = run_batch(jobs, RecordWriter(output, args.format), args.workers)
+    finally:
+        if args.output:
+            output.close()
+    sys.exit(1 if failures else 0)
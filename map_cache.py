@@ -0,0 +1,69 @@
+from lexicon import source_digest
+import logging
+from map import Map
+from map_codec import FORMAT_VERSION, encode_map
+import os
+import struct
+import time
+import zlib
+
+CACHE_DIR = 'cache'
+CACHE_MAGIC = b'ASMAP'
+CACHE_VERSION = 3  # Bumped whenever generation changes what a seed produces
+# magic, cache version, snapshot format version, seed, size, maze generator, words.json digest
+CACHE_HEADER = struct.Struct('<5sHHQI8s20s')
+
+class MapCache:
+    def __init__(self, directory=CACHE_DIR, words_file='words.json'):
+        self.perf_logger = logging.getLogger('perf')
+        self.directory = directory
+        self.words_file = words_file
+
+    def header(self, size, generator, seed):
+        return CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, FORMAT_VERSION, seed % 2 ** 64, size,
+                                 generator.encode(), source_digest(self.words_file))
+
+    def path(self, size, generator, seed):
+        digest = source_digest(self.words_file).hex()[:12]
+        return os.path.join(self.directory, f"map_{size}_{generator}_{seed}_{digest}.bin")
+
+    def load(self, size, generator, seed):
+        path = self.path(size, generator, seed)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        if data[:CACHE_HEADER.size] != self.header(size, generator, seed):
+            self.perf_logger.info(f"Ignoring stale map cache file {path}")
+            return None
+        return data[CACHE_HEADER.size:]
+
+    def store(self, game_map, snapshot=None):
+        snapshot = snapshot if snapshot is not None else encode_map(game_map)
+        path = self.path(game_map.size, game_map.generator_name, game_map.seed)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Write then rename so a crash or a second process never leaves half a file behind
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            with open(temporary_path, 'wb') as file:
+                file.write(self.header(game_map.size, game_map.generator_name, game_map.seed))
+                file.write(snapshot)
+            os.replace(temporary_path, path)
+        except OSError as error:
+            self.perf_logger.warning(f"Could not write map cache file {path}: {error}")
+        return snapshot
+
+    def get_map(self, size, generator, seed):
+        start = time.perf_counter()
+        snapshot = self.load(size, generator, seed)
+        if snapshot is not None:
+            try:
+                game_map = Map(size, generator, seed, snapshot=snapshot)
+                self.perf_logger.info(f"Loaded size {size} {generator} map for seed {seed} from the cache in {(time.perf_counter() - start) * 1000:.1f} ms")
+                return game_map
+            except (ValueError, EOFError, KeyError, zlib.error) as error:
+                self.perf_logger.warning(f"Unreadable map cache entry for seed {seed}: {error}")
+        game_map = Map(size, generator, seed)
+        self.store(game_map)
+        return game_map
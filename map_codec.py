@@ -0,0 +1,68 @@
+from array import array
+from grid_topology import GridTopology
+import marshal
+import numpy as np
+from room import EMPTY_STRING, NO_STRING, RoomGrid
+import zlib
+
+FORMAT_VERSION = 1
+
+
+def encode_map(game_map):
+    # Rooms are stored in Map.rooms order as grid indices, with every string interned in one table
+    size = game_map.size
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return -1
+        return strings.setdefault(value, len(strings))
+
+    positions = array('i')
+    room_fields = []
+    for (x, y), room in game_map.rooms.items():
+        positions.append(y * size + x)
+        room_fields.append((room.room_id, intern(room.region), intern(room.name), intern(room.atmo),
+                            intern(room.color), tuple(intern(item) for item in room.decorations)))
+    payload = {
+        'version': FORMAT_VERSION,
+        'size': size,
+        'generator': game_map.generator_name,
+        'seed': game_map.seed,
+        'connections': game_map.topology.connections.tobytes(),
+        'positions': positions.tobytes(),
+        'rooms': room_fields,
+        'strings': list(strings),
+        'rooms_with_keys': [room.y * size + room.x for room in game_map.rooms_with_keys]
+    }
+    return zlib.compress(marshal.dumps(payload))
+
+
+def decode_payload(data):
+    payload = marshal.loads(zlib.decompress(data))
+    if payload.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported map snapshot version {payload.get('version')}, expected {FORMAT_VERSION}")
+    return payload
+
+
+def restore_map(game_map, data):
+    payload = decode_payload(data)
+    size = payload['size']
+    strings = payload['strings']
+    game_map.seed = payload['seed']
+    game_map.topology = GridTopology(size)
+    game_map.topology.connections[:] = np.frombuffer(payload['connections'], dtype=np.uint8).reshape(size, size)
+    rooms = game_map.rooms = RoomGrid(game_map)
+    # The snapshot's string indices become the grid's own codes in one lookup per field; -1 stored None
+    codes = np.array([rooms.code(string) for string in strings] + [NO_STRING], dtype=np.uint16)
+    indices = np.frombuffer(payload['positions'], dtype=np.int32)
+    fields = np.array([room[1:5] for room in payload['rooms']], dtype=np.int64).reshape(-1, 4)
+    rooms.add_many(indices, [room[0] for room in payload['rooms']])
+    rooms.regions[indices] = codes[fields[:, 0]]
+    for column, field in ((1, rooms.names), (2, rooms.atmos), (3, rooms.colors)):
+        field[indices] = np.where(fields[:, column] >= 0, codes[fields[:, column]], EMPTY_STRING)
+    for index, room in zip(indices.tolist(), payload['rooms']):
+        if room[5]:
+            rooms.set_decorations(index, [strings[item] for item in room[5]])
+    game_map.rooms_with_keys = [game_map.rooms[(index % size, index // size)] for index in payload['rooms_with_keys']]
+    return game_map
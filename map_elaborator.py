@@ -1,4 +1,4 @@
-import json
+from lexicon import get_lexicon
 import logging
 from region_assignment import RegionAssignment
 from room_atmos import RoomAtmos
@@ -10,20 +10,18 @@ class MapElaborator:
         self.map_logger = logging.getLogger('map')
         self.map = map_instance
         self.map_logger .debug("MapElaborator captured the map. Assigning regions...")
-        with open(words_file, 'r') as file:
-            data = json.load(file)
-        self.region_assignment = RegionAssignment(self.map, data['locations'])
+        lexicon = get_lexicon(words_file)
+        self.region_assignment = RegionAssignment(self.map, lexicon)
         self.map_logger.debug("Regions assigned, decorating rooms...")
-        self.region_assignment.assign_regions()
 
         self.object_distribution = ObjectDistribution(self.map)
         self.map_logger .debug("Objects distributed.")
         self.object_distribution.distribute_items()
 
-        self.room_decoration = RoomDecoration(self.map, data)
+        self.room_decoration = RoomDecoration(self.map, lexicon)
         self.map_logger.debug("Rooms decorated, distributing objects...")
         self.room_decoration.decorate_rooms()
 
-        self.room_atmos = RoomAtmos(self.map, data)
+        self.room_atmos = RoomAtmos(self.map, lexicon)
         self.map_logger.debug("Objects distributed, adding atmosphere...")
         self.room_atmos.create_atmosphere()
\ No newline at end of file
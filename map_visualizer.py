@@ -1,4 +1,7 @@
 import colorsys
+from exploration_tracker import ExplorationTracker
+from lighting import MAX_LIGHT_LEVEL, get_stencil
+import numpy as np
 import pygame
 import random
 
@@ -19,96 +22,172 @@ class MapVisualizer:
         self.cell_size = int((max_dimension - total_padding) / ((4/3 * self.game_map.size) - 1/3))
         self.connection_size = self.cell_size // 3
         self.region_color_mapping, self.region_colors = self.generate_region_colors()
-        self.dead_ends = [room for room in self.game_map.rooms.values() if sum(1 for conn in room.connections.values() if conn) == 1]
-        self.explored = set() 
-        self.explored.add((player.x, player.y))
-        self.max_light_level = 5
-        self.max_lit = len(self.game_map.rooms) * self.max_light_level
+        self.dead_ends = {self.game_map.rooms[pos] for pos in self.game_map.topology.dead_ends()}
+        self.max_light_level = MAX_LIGHT_LEVEL
+        self.lights = self.game_map.get_light_engine()
+        self.exploration = ExplorationTracker(self.game_map, self.max_light_level)
+        self.exploration.add((player.x, player.y))
+        self.map_revealed = False
         self.current_lit = self.calculate_percent_lit()
         self.x_offset = self.game_manager.map_area_x
         self.tick_count = 0
         self.flash_rate = 15
+        self.tile_size = self.cell_size + self.connection_size
+        self.rooms_in_order = list(self.game_map.rooms.values())
+        self.draw_order = np.full((self.game_map.size, self.game_map.size), -1, dtype=np.intp)
+        for index, room in enumerate(self.rooms_in_order):
+            self.draw_order[room.y, room.x] = index
+        max_room_x = max(room.x for room in self.rooms_in_order)
+        max_room_y = max(room.y for room in self.rooms_in_order)
+        self.border_rect = (self.x_offset, 0, (max_room_x + 1) * self.tile_size + self.padding * 2, (max_room_y + 1) * self.tile_size)
+        self.surface = None
+        self.targets = None
+        self.dirty_cells = set()  # Rooms whose light or items changed since the last frame
+        self.drawn_enemies = set()
+        self.drawn_player = None
+        self.drawn_flash = None
 
     def get_color_intensity(self, base_color, light_level, max_light_level=5):
         factor = light_level / max_light_level
         adjusted_color = tuple(min(int(c * factor), 255) for c in base_color)
         return adjusted_color
         
-    def update_light_levels(self, visibility_radius):
-        current_player_room = self.game_map.rooms.get((self.player.x, self.player.y))
-        if current_player_room:
-            current_player_room.lit = 5
-        for dx in range(-visibility_radius, visibility_radius + 1):
-            for dy in range(-visibility_radius, visibility_radius + 1):
-                if dx == 0 and dy == 0:
-                    continue
-                distance = self.calculate_distance(0, 0, dx, dy)
-                if distance <= visibility_radius:
-                    room = self.game_map.rooms.get((self.player.x + dx, self.player.y + dy))
-                    if room:
-                        light_level = min(5 - int(distance), 4)
-                        room.lit = max(room.lit, light_level)
-    
     def draw_map(self, screen):
+        # Rooms are drawn once onto a surface of their own and afterwards only where something changed. Each room
+        # owns a tile, its cell plus the gaps east and south of it; a change in a room redraws the tiles around it,
+        # repainting every room that reaches into them in the original order, clipped to runs of tiles in a row
         self.tick_count += 1
         if self.tick_count >= self.flash_rate * 2:
             self.tick_count = 0
         if self.player.has_map:
-            for room in self.game_map.rooms.values():
-                room.lit = self.max_light_level
+            if not self.map_revealed:
+                self.reveal_map()
         elif self.player.visibility_radius_changed:
             self.update_light_levels(self.player.visibility_radius)
-        enemy_positions = {(enemy.x, enemy.y) for enemy in self.game_manager.enemy_manager.enemies}
-        
-        for room in self.game_map.rooms.values():
-            x = room.x * (self.cell_size + self.connection_size) + self.padding + self.x_offset
-            y = room.y * (self.cell_size + self.connection_size) + self.padding
-            room_pos = (room.x, room.y)
-            if room.lit > 0:
-                region_index = self.region_color_mapping.get(room.region, 0)
-                base_room_color = self.region_colors[region_index]
-                base_dead_end_color = (155, 155, 0)
-                room_color = self.get_color_intensity(base_room_color, room.lit)
-                if room_pos == (self.player.x, self.player.y):
-                    pygame.draw.rect(screen, (0, 255, 0), (x-2, y-2, self.cell_size+4, self.cell_size+4), 2)
-                    room_color = (0, 0, 255)  # Player's room
-                elif room_pos in enemy_positions:
-                    base_enemy_color = (255, 0, 0)  # Enemy's room
-                    room_color = self.get_color_intensity(base_enemy_color, room.lit)
-                elif room in self.dead_ends and len(room.decorations) > 0:
-                    room_color = self.get_color_intensity(base_dead_end_color, room.lit)
+        enemy_positions = self.game_manager.enemy_manager.occupied_rooms()
+        player_position = (self.player.x, self.player.y)
+        if self.player.got_relic and self.targets is None:
+            self.targets = [(room.x, room.y) for room in self.game_map.rooms.values() if room.is_target]
+        flash = (self.targets, self.tick_count < self.flash_rate)
+        cells = self.dirty_cells
+        cells.update(self.exploration.newly_explored)
+        cells.update(enemy_positions ^ self.drawn_enemies)
+        if player_position != self.drawn_player:
+            cells.update((player_position, self.drawn_player))
+        if flash != self.drawn_flash and self.targets:
+            cells.update(self.targets)
+        if self.surface is None or len(cells) * 3 >= len(self.rooms_in_order):
+            self.redraw_all(enemy_positions)
+        elif cells:
+            spans = self.tile_spans(cells)
+            # A run of w tiles repaints the 3 * (w + 2) rooms that reach into it; past the whole map, repaint that
+            if sum(3 * (right - left + 3) for _, left, right in spans) >= len(self.rooms_in_order):
+                self.redraw_all(enemy_positions)
             else:
-                room_color = (0, 0, 0)
-            # Should be visible flashing from wherever it is
-            if self.player.got_relic and room.is_target:
-                if self.tick_count < self.flash_rate:
-                    room_color = (0, 200, 0)  # Green
-                else:
-                    room_color = (255, 255, 0) # Yellow
-                self.draw_connectionless_edges(screen, room, x, y)
-            pygame.draw.rect(screen, room_color, (x, y, self.cell_size, self.cell_size))
-            if room.lit > 0:
-                smaller_rect_x = x + self.cell_size / 8
-                smaller_rect_y = y + self.cell_size / 8
-                smaller_rect_size = 3 * self.cell_size / 4
-                lighter_room_color = self.lighten_color(room_color)
-                pygame.draw.rect(screen, lighter_room_color, (smaller_rect_x, smaller_rect_y, smaller_rect_size, smaller_rect_size))
-                for direction, connected_room in room.connections.items():
-                    if connected_room and (connected_room.x, connected_room.y) in self.explored:
-                        self.draw_connection(screen, x, y, direction, room_color)
-        # Determine the border dimensions
-        border_x = self.padding
-        border_y = 0
-        max_room_x = max(room.x for room in self.game_map.rooms.values())
-        max_room_y = max(room.y for room in self.game_map.rooms.values())
-        border_width = (max_room_x + 1) * (self.cell_size + self.connection_size) + self.padding * 2
-        border_height = (max_room_y + 1) * (self.cell_size + self.connection_size)
-        border_color = (144, 236, 144)
-        pygame.draw.rect(screen, border_color, (self.x_offset - self.padding + border_x, border_y, border_width, border_height), self.border_width)
+                self.redraw_spans(spans, enemy_positions)
+        self.dirty_cells = set()
+        self.exploration.newly_explored.clear()
+        self.drawn_enemies = set(enemy_positions)
+        self.drawn_player = player_position
+        self.drawn_flash = flash
+        screen.blit(self.surface, (self.x_offset, 0))
+        pygame.draw.rect(screen, (144, 236, 144), self.border_rect, self.border_width)
+
+    def mark_window(self, rows, columns, before):
+        # Light changes come back as a window and what it held before; only rooms whose level moved are redrawn
+        for y, x in zip(*np.nonzero(self.game_map.light[rows, columns] != before)):
+            self.dirty_cells.add((int(x) + columns.start, int(y) + rows.start))
+
+    def mark_cells(self, indices, before):
+        size = self.game_map.size
+        for index in indices[self.game_map.light.reshape(-1)[indices] != before].tolist():
+            self.dirty_cells.add((index % size, index // size))
+
+    def tile_spans(self, cells):
+        # The tiles around the changed rooms, as (row, first column, last column) runs
+        size = self.game_map.size
+        rows = {}
+        for x, y in cells:
+            for ty in range(max(0, y - 1), min(size, y + 2)):
+                rows.setdefault(ty, set()).update(range(max(0, x - 1), min(size, x + 2)))
+        spans = []
+        for ty, columns in rows.items():
+            columns = sorted(columns)
+            left = previous = columns[0]
+            for tx in columns[1:]:
+                if tx != previous + 1:
+                    spans.append((ty, left, previous))
+                    left = tx
+                previous = tx
+            spans.append((ty, left, previous))
+        return spans
+
+    def redraw_all(self, enemy_positions):
+        if self.surface is None:
+            self.surface = pygame.Surface((self.tile_size * self.game_map.size + self.padding * 2,) * 2)
+        self.surface.set_clip(None)
+        self.surface.fill((0, 0, 0))
+        light = self.game_map.light.tolist()
+        for room in self.rooms_in_order:
+            self.draw_room(self.surface, room, light[room.y][room.x], enemy_positions)
+
+    def redraw_spans(self, spans, enemy_positions):
+        size = self.game_map.size
+        light = self.game_map.light
+        for ty, first, last in spans:
+            # Tiles on the edge also own the padding beyond them
+            left = self.padding + first * self.tile_size if first else 0
+            top = self.padding + ty * self.tile_size if ty else 0
+            right = self.padding + (last + 1) * self.tile_size if last < size - 1 else self.surface.get_width()
+            bottom = self.padding + (ty + 1) * self.tile_size if ty < size - 1 else self.surface.get_height()
+            self.surface.set_clip((left, top, right - left, bottom - top))
+            self.surface.fill((0, 0, 0))
+            order = self.draw_order[max(0, ty - 1):ty + 2, max(0, first - 1):last + 2]
+            for index in np.sort(order[order >= 0]).tolist():
+                room = self.rooms_in_order[index]
+                self.draw_room(self.surface, room, int(light[room.y, room.x]), enemy_positions)
+        self.surface.set_clip(None)
+
+    def draw_room(self, screen, room, lit, enemy_positions):
+        x = room.x * self.tile_size + self.padding
+        y = room.y * self.tile_size + self.padding
+        room_pos = (room.x, room.y)
+        if lit > 0:
+            region_index = self.region_color_mapping.get(room.region, 0)
+            base_room_color = self.region_colors[region_index]
+            base_dead_end_color = (155, 155, 0)
+            room_color = self.get_color_intensity(base_room_color, lit)
+            if room_pos == (self.player.x, self.player.y):
+                pygame.draw.rect(screen, (0, 255, 0), (x-2, y-2, self.cell_size+4, self.cell_size+4), 2)
+                room_color = (0, 0, 255)  # Player's room
+            elif room_pos in enemy_positions:
+                base_enemy_color = (255, 0, 0)  # Enemy's room
+                room_color = self.get_color_intensity(base_enemy_color, lit)
+            elif room in self.dead_ends and len(room.decorations) > 0:
+                room_color = self.get_color_intensity(base_dead_end_color, lit)
+        else:
+            room_color = (0, 0, 0)
+        # Should be visible flashing from wherever it is
+        if self.player.got_relic and room.is_target:
+            if self.tick_count < self.flash_rate:
+                room_color = (0, 200, 0)  # Green
+            else:
+                room_color = (255, 255, 0) # Yellow
+            self.draw_connectionless_edges(screen, room, x, y)
+        pygame.draw.rect(screen, room_color, (x, y, self.cell_size, self.cell_size))
+        if lit > 0:
+            smaller_rect_x = x + self.cell_size / 8
+            smaller_rect_y = y + self.cell_size / 8
+            smaller_rect_size = 3 * self.cell_size / 4
+            lighter_room_color = self.lighten_color(room_color)
+            pygame.draw.rect(screen, lighter_room_color, (smaller_rect_x, smaller_rect_y, smaller_rect_size, smaller_rect_size))
+            for direction, connected_room in room.connections.items():
+                if connected_room and (connected_room.x, connected_room.y) in self.exploration:
+                    self.draw_connection(screen, x, y, direction, room_color)
 
     def draw_all_connections(self):
         for room in self.game_map.rooms.values():
-            self.explored.add((room.x, room.y))
+            self.exploration.add((room.x, room.y))
 
     def get_room_color(self, room):
         region_index = self.region_color_mapping.get(room.region, 0)
@@ -140,34 +219,36 @@ class MapVisualizer:
         if 'w' not in room.connections or room.connections['w'] is None:
             pygame.draw.line(screen, border_color, (x, y), (x, y + self.cell_size), border_width)
 
-    def calculate_distance(self, x1, y1, x2, y2):
-        return ((x1 - x2) ** 2 + (y1 - y2) ** 2) ** 0.5
-
     def update_light_levels(self, visibility_radius):
-        self.explored.add((self.player.x, self.player.y))
-        max_light_level = 5
-
-        for dx in range(-visibility_radius, visibility_radius + 1):
-            for dy in range(-visibility_radius, visibility_radius + 1):
-                distance = self.calculate_distance(0, 0, dx, dy)
-                if distance <= visibility_radius:
-                    room = self.game_map.rooms.get((self.player.x + dx, self.player.y + dy))
-                    if room:
-                        # Adjust light level based on distance and visibility radius
-                        if distance == 0:
-                            light_level = max_light_level
-                        elif visibility_radius in [3, 4] and distance == 1:
-                            light_level = visibility_radius - 1
-                        else:
-                            light_level = 1
-
-                        room.lit = max(room.lit, light_level)
+        self.exploration.add((self.player.x, self.player.y))
+        if self.game_manager.field_of_view:
+            # Light goes round corners only as far as the doorways lead, radius counted in rooms walked
+            indices, levels = self.game_map.get_visibility().view(self.player.x, self.player.y, visibility_radius)
+            change = self.lights.light_cells(indices, levels)
+            self.exploration.cells_changed(*change)
+            self.mark_cells(*change)
+        else:
+            change = self.lights.stamp(self.player.x, self.player.y, get_stencil(visibility_radius))
+            self.exploration.window_changed(*change)
+            self.mark_window(*change)
+
+    def room_items_changed(self, room):
+        # Lanterns, torches and the like light the room they lie in until someone takes them
+        change = self.lights.room_changed(room)
+        if change is not None:
+            self.exploration.window_changed(*change)
+            self.mark_window(*change)
+        self.dirty_cells.add((room.x, room.y))  # A dead end with items in it is drawn in its own colour
+
+    def reveal_map(self):
+        # The player's light only ever rises, so one fill lasts until the next map
+        self.lights.reveal()
+        self.exploration.recount()
+        self.dirty_cells.update((room.x, room.y) for room in self.rooms_in_order)
+        self.map_revealed = True
 
     def calculate_percent_lit(self):
-        total_lit = 0
-        for room in self.game_map.rooms.values():
-            total_lit += room.lit
-        return round(100 * total_lit / self.max_lit, 2)
+        return self.exploration.percent_lit()
 
     def generate_region_colors(self):
         unique_regions = list(set(room.region for room in self.game_map.rooms.values()))
@@ -0,0 +1,235 @@
+from collections import deque
+from itertools import permutations
+import logging
+import random
+from disjoint_set import DisjointSet
+
+MAX_STRAIGHT_RUN = 4  # A corridor may run straight on this many times after its first segment
+DIRECTIONS = ('n', 's', 'e', 'w')
+DIRECTION_BITS = (1, 2, 4, 8)
+OPPOSITE_CODES = (1, 0, 3, 2)
+DIRECTION_ORDERS = tuple(permutations(range(4)))
+# Every open-neighbour mask maps to the same shared tuple of direction codes
+OPEN_DIRECTIONS = tuple(tuple(code for code in range(4) if mask & DIRECTION_BITS[code]) for mask in range(16))
+
+
+class MazeGenerator:
+    name = None
+
+    def __init__(self, rng=None, max_straight_run=MAX_STRAIGHT_RUN):
+        self.generator_logger = logging.getLogger('connector')
+        self.rng = rng if rng is not None else random
+        self.max_straight_run = max_straight_run
+        self.forced_connections = 0
+
+    def generate(self, positions, width, height):
+        # The grid is padded by one empty cell on each side so neighbour lookups never need bounds checks
+        self.stride = width + 2
+        self.steps = (-self.stride, self.stride, 1, -1)
+        self.occupied = bytearray(self.stride * (height + 2))
+        for x, y in positions:
+            self.occupied[self.to_index(x, y)] = 1
+        self.mask = bytearray(len(self.occupied))
+        self.edges = []
+        self.forced_connections = 0
+        self.carve()
+        if self.forced_connections:
+            self.generator_logger.debug(f"{self.name}: {self.forced_connections} connections broke the straight run limit to keep the map connected")
+        return [(self.to_position(index), DIRECTIONS[code]) for index, code in self.edges]
+
+    def carve(self):
+        raise NotImplementedError
+
+    def to_index(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def to_position(self, index):
+        return index % self.stride - 1, index // self.stride - 1
+
+    def cells(self):
+        occupied = self.occupied
+        return [index for index in range(len(occupied)) if occupied[index]]
+
+    def open_mask(self, index):
+        occupied, steps = self.occupied, self.steps
+        return (occupied[index + steps[0]] | occupied[index + steps[1]] << 1
+                | occupied[index + steps[2]] << 2 | occupied[index + steps[3]] << 3)
+
+    def shuffled_directions(self):
+        return list(DIRECTION_ORDERS[self.rng.randrange(len(DIRECTION_ORDERS))])
+
+    def straight_run(self, index, code):
+        bit, step, mask = DIRECTION_BITS[code], self.steps[code], self.mask
+        run = 0
+        while mask[index] & bit and run <= self.max_straight_run:
+            index += step
+            run += 1
+        return run
+
+    def can_connect(self, index, code):
+        target = index + self.steps[code]
+        run = self.straight_run(index, OPPOSITE_CODES[code]) + 1 + self.straight_run(target, code)
+        return run <= self.max_straight_run + 1
+
+    def connect(self, index, code):
+        self.mask[index] |= DIRECTION_BITS[code]
+        self.mask[index + self.steps[code]] |= DIRECTION_BITS[OPPOSITE_CODES[code]]
+        self.edges.append((index, code))
+
+    def join_components(self, components, candidates, component_of):
+        # Candidates are packed as index << 2 | direction code. Cheapest joins first: edges that respect the straight run limit, then whatever is left
+        find = components.find
+        for forced in (False, True):
+            deferred = []
+            for candidate in candidates:
+                index, code = candidate >> 2, candidate & 3
+                a, b = find(component_of(index)), find(component_of(index + self.steps[code]))
+                if a == b:
+                    continue
+                if forced or self.can_connect(index, code):
+                    components.union(a, b)
+                    self.connect(index, code)
+                    self.forced_connections += forced
+                else:
+                    deferred.append(candidate)
+            if not deferred:
+                break
+            candidates = deferred
+
+
+class IterativeDFSGenerator(MazeGenerator):
+    name = 'dfs'
+
+    def carve(self):
+        occupied, steps = self.occupied, self.steps
+        tree_of = [-1] * len(occupied)
+        secondary_cells = []
+        tree_count = 0
+        for start in self.cells():
+            if tree_of[start] >= 0:
+                continue
+            tree = tree_count
+            tree_count += 1
+            tree_of[start] = tree
+            if tree:
+                secondary_cells.append(start)
+            stack = [(start, self.shuffled_directions())]
+            while stack:
+                index, codes = stack[-1]
+                if not codes:
+                    stack.pop()
+                    continue
+                code = codes.pop()
+                target = index + steps[code]
+                if occupied[target] and tree_of[target] < 0 and self.can_connect(index, code):
+                    self.connect(index, code)
+                    tree_of[target] = tree
+                    stack.append((target, self.shuffled_directions()))
+                    if tree:
+                        secondary_cells.append(target)
+        if tree_count > 1:
+            # Cells the straight run limit cut off became trees of their own; graft them back on
+            candidates = [index << 2 | code for index in secondary_cells for code in range(4)
+                          if occupied[index + steps[code]] and tree_of[index + steps[code]] != tree_of[index]]
+            self.rng.shuffle(candidates)
+            self.join_components(DisjointSet(tree_count), candidates, tree_of.__getitem__)
+
+
+class KruskalGenerator(MazeGenerator):
+    name = 'kruskal'
+
+    def carve(self):
+        occupied, steps = self.occupied, self.steps
+        candidates = []
+        for index in self.cells():
+            if occupied[index + steps[1]]:
+                candidates.append(index << 2 | 1)
+            if occupied[index + steps[2]]:
+                candidates.append(index << 2 | 2)
+        self.rng.shuffle(candidates)
+        self.join_components(DisjointSet(len(occupied)), candidates, int)
+
+
+class WilsonGenerator(MazeGenerator):
+    name = 'wilson'
+    seed_spacing = 16  # Walks on big maps would take forever to find a single root
+    walk_attempts = 8
+
+    def carve(self):
+        occupied, steps, rng = self.occupied, self.steps, self.rng
+        cells = self.cells()
+        rng.shuffle(cells)
+        tree_of = [-1] * len(occupied)
+        exits = bytearray(len(occupied))
+        open_masks = bytearray(len(occupied))
+        for index in cells:
+            open_masks[index] = self.open_mask(index)
+        tree_count = self.seed_roots(cells, tree_of)
+        for start in cells:
+            attempts = 0
+            while tree_of[start] < 0:
+                # Random walk until a tree is hit; overwriting exits erases the loops as we go
+                index = start
+                while tree_of[index] < 0:
+                    code = rng.choice(OPEN_DIRECTIONS[open_masks[index]])
+                    exits[index] = code
+                    index += steps[code]
+                path = []
+                index = start
+                while tree_of[index] < 0:
+                    path.append(index)
+                    index += steps[exits[index]]
+                attempts += 1
+                # Carve back from the tree so a walk cut short by the straight run limit stays attached
+                for position in range(len(path) - 1, -1, -1):
+                    index = path[position]
+                    code = exits[index]
+                    if not self.can_connect(index, code):
+                        if position < len(path) - 1 or attempts < self.walk_attempts:
+                            break
+                        self.forced_connections += 1
+                    self.connect(index, code)
+                    tree_of[index] = tree_of[index + steps[code]]
+        if tree_count > 1:
+            candidates = [index << 2 | code for index in cells for code in (1, 2)
+                          if occupied[index + steps[code]] and tree_of[index + steps[code]] != tree_of[index]]
+            rng.shuffle(candidates)
+            self.join_components(DisjointSet(tree_count), candidates, tree_of.__getitem__)
+
+    def seed_roots(self, cells, tree_of):
+        # Every island of the grid needs a root or walks on it would never end, and a sparse
+        # lattice of extra roots keeps the walks short; the trees are joined afterwards
+        occupied, steps, stride, spacing = self.occupied, self.steps, self.stride, self.seed_spacing
+        tree_count = 0
+        for index in cells:
+            if index % stride % spacing == 0 and index // stride % spacing == 0:
+                tree_of[index] = tree_count
+                tree_count += 1
+        labelled = bytearray(len(occupied))
+        for root in cells:
+            if labelled[root]:
+                continue
+            has_root = False
+            labelled[root] = 1
+            queue = deque([root])
+            while queue:
+                index = queue.popleft()
+                has_root = has_root or tree_of[index] >= 0
+                for step in steps:
+                    target = index + step
+                    if occupied[target] and not labelled[target]:
+                        labelled[target] = 1
+                        queue.append(target)
+            if not has_root:
+                tree_of[root] = tree_count
+                tree_count += 1
+        return tree_count
+
+
+GENERATORS = {generator.name: generator for generator in (IterativeDFSGenerator, KruskalGenerator, WilsonGenerator)}
+
+
+def create_generator(name, rng=None):
+    if name not in GENERATORS:
+        raise ValueError(f"Unknown maze generator '{name}'. Expected one of {', '.join(GENERATORS)}.")
+    return GENERATORS[name](rng)
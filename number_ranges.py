@@ -0,0 +1,12 @@
+def parse_ranges(values):
+    # Command line lists of whole numbers, for map sizes, player levels and the like
+    numbers = []
+    for value in values:
+        if '-' in value:
+            # "20-60:20" is every number from 20 to 60 in steps of 20
+            bounds, _, step = value.partition(':')
+            low, high = (int(bound) for bound in bounds.split('-'))
+            numbers.extend(range(low, high + 1, int(step or 1)))
+        else:
+            numbers.append(int(value))
+    return numbers
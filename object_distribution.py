@@ -1,20 +1,19 @@
-import json
+from lexicon import get_lexicon
 import logging
-import random
 
 class ObjectDistribution:
     def __init__(self, map_instance):
         self.map_logger = logging.getLogger('map')
         self.map = map_instance
-        self.placement_rooms = [room for room in self.map.rooms.values() if sum(1 for conn in room.connections.values() if conn) == 1]
-        with open('words.json', 'r') as file:
-            object_data = json.load(file)["objects"]
-            self.artifact_data = random.sample(object_data["artifacts"], 1)  # One random artifact
-            self.tool_data = object_data["tools"]  # One of each tool
-            self.weapon_data = random.sample(object_data["weapons"], 1)  # One random weapon
-            self.armor_data = random.sample(object_data["armor"], 1)  # One random armor
+        self.rng = self.map.stage_rng('objects')
+        self.placement_rooms = [self.map.rooms[pos] for pos in self.map.topology.dead_ends()]
+        object_data = get_lexicon().objects
+        self.artifact_data = self.rng.sample(object_data["artifacts"], 1)  # One random artifact
+        self.tool_data = list(object_data["tools"])  # One of each tool
+        self.weapon_data = self.rng.sample(object_data["weapons"], 1)  # One random weapon
+        self.armor_data = self.rng.sample(object_data["armor"], 1)  # One random armor
         self.all_items = self.artifact_data + self.tool_data + self.weapon_data + self.armor_data
-        random.shuffle(self.all_items)
+        self.rng.shuffle(self.all_items)
         self.distribute_items()
         
         self.map.room_connector.clear_remaining_dead_ends()
@@ -32,12 +31,12 @@ class ObjectDistribution:
         return ""
     
     def distribute_items(self):
-        random.shuffle(self.placement_rooms)
+        self.rng.shuffle(self.placement_rooms)
         for item in self.all_items:
             if self.placement_rooms:
                 room = self.placement_rooms.pop()
                 self.map.rooms_with_keys.append(room)
-                room.decorations.append(item)
+                room.add_decoration(item)
 
     def visualize_object_distribution(self):
         map_width = max(x for x, _ in self.map.rooms.keys()) + 1
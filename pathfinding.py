@@ -0,0 +1,157 @@
+from grid_topology import DIRECTION_BITS
+import heapq
+
+
+class PathFinder:
+    # A* over room connections. Scratch arrays are sized to the grid once and stamped with the search
+    # generation, so a search only ever touches the rooms it reaches and allocates nothing map-sized
+    def __init__(self, game_map):
+        self.map = game_map
+        self.size = game_map.size
+        cells = self.size * self.size
+        self.index_bits = cells.bit_length()
+        self.steps = ((DIRECTION_BITS['n'], -self.size), (DIRECTION_BITS['s'], self.size),
+                      (DIRECTION_BITS['e'], 1), (DIRECTION_BITS['w'], -1))
+        self.g_score = [0] * cells
+        self.parent = [-1] * cells
+        self.seen = [0] * cells
+        self.closed = [0] * cells
+        self.generation = 0
+        self.expansions = 0
+        self.total_expansions = 0
+        self.searches = 0
+        self.capped_searches = 0
+        self.refresh()
+
+    def refresh(self):
+        # Searches read a snapshot of the connection masks; take a new one whenever connections change
+        self.masks = self.map.topology.connections.ravel().tolist()
+
+    def find_path(self, start, target, max_expansions=None):
+        # Flat grid indices in, the rooms after start up to and including target out. When the expansion
+        # cap is hit the path leads to the room found closest to the target instead
+        self.generation += 1
+        generation, size, index_bits = self.generation, self.size, self.index_bits
+        g_score, parent, seen, closed, masks, steps = self.g_score, self.parent, self.seen, self.closed, self.masks, self.steps
+        index_mask = (1 << index_bits) - 1
+        h_shift = index_bits
+        f_shift = index_bits * 2
+        target_x, target_y = target % size, target // size
+        start_h = abs(start % size - target_x) + abs(start // size - target_y)
+        g_score[start], parent[start], seen[start] = 0, -1, generation
+        # Heap keys pack f, then h to prefer rooms nearer the target on ties, then the room index
+        heap = [start_h << f_shift | start_h << h_shift | start]
+        best, best_h = start, start_h
+        expansions = 0
+        reached = False
+        while heap:
+            key = heapq.heappop(heap)
+            index = key & index_mask
+            if closed[index] == generation:
+                continue
+            if index == target:
+                reached = True
+                break
+            if max_expansions is not None and expansions >= max_expansions:
+                self.capped_searches += 1
+                break
+            closed[index] = generation
+            expansions += 1
+            h = key >> h_shift & index_mask
+            if h < best_h:
+                best, best_h = index, h
+            tentative = g_score[index] + 1
+            mask = masks[index]
+            for bit, step in steps:
+                if not mask & bit:
+                    continue
+                neighbor = index + step
+                if seen[neighbor] == generation and (closed[neighbor] == generation or g_score[neighbor] <= tentative):
+                    continue
+                seen[neighbor] = generation
+                g_score[neighbor] = tentative
+                parent[neighbor] = index
+                neighbor_h = abs(neighbor % size - target_x) + abs(neighbor // size - target_y)
+                heapq.heappush(heap, (tentative + neighbor_h) << f_shift | neighbor_h << h_shift | neighbor)
+        self.expansions = expansions
+        self.total_expansions += expansions
+        self.searches += 1
+        return self.reconstruct_path(target if reached else best)
+
+    def reconstruct_path(self, index):
+        path = []
+        parent = self.parent
+        while parent[index] >= 0:  # Exclude the starting room
+            path.append(index)
+            index = parent[index]
+        path.reverse()
+        return path
+
+    def find_room_path(self, start_room, target_room, max_expansions=None):
+        size, rooms = self.size, self.map.rooms
+        path = self.find_path(start_room.y * size + start_room.x, target_room.y * size + target_room.x, max_expansions)
+        return [rooms[(index % size, index // size)] for index in path]
+
+    def stats(self):
+        return {'searches': self.searches, 'expansions': self.total_expansions, 'capped_searches': self.capped_searches,
+                'expansions_per_search': round(self.total_expansions / self.searches, 1) if self.searches else 0}
+
+
+class DistanceField:
+    # Hop distances from every room within max_distance of a root room, stamped like the PathFinder scratch
+    # arrays. Moving the root by one room shifts the distance of every room in the field, so a move rebuilds
+    # the bounded field rather than repairing it; the bound is what keeps that cheap
+    def __init__(self, game_map, max_distance):
+        self.pathfinder = game_map.get_pathfinder()
+        self.size = game_map.size
+        self.max_distance = max_distance
+        cells = self.size * self.size
+        self.distances = [0] * cells
+        self.stamps = [0] * cells
+        self.generation = 0
+        self.root = -1
+        self.members = []  # Rooms the field reached, nearest first
+        self.builds = 0
+        self.reached = 0
+
+    def update(self, root):
+        if root == self.root:
+            return False
+        self.generation += 1
+        self.root = root
+        generation, distances, stamps, masks, steps = self.generation, self.distances, self.stamps, self.pathfinder.masks, self.pathfinder.steps
+        distances[root], stamps[root] = 0, generation
+        frontier = [root]
+        members = [root]
+        for distance in range(1, self.max_distance + 1):
+            next_frontier = []
+            for index in frontier:
+                mask = masks[index]
+                for bit, step in steps:
+                    neighbor = index + step
+                    if mask & bit and stamps[neighbor] != generation:
+                        distances[neighbor], stamps[neighbor] = distance, generation
+                        next_frontier.append(neighbor)
+            if not next_frontier:
+                break
+            members.extend(next_frontier)
+            frontier = next_frontier
+        self.members = members
+        self.builds += 1
+        self.reached = len(members)
+        return True
+
+    def distance_to(self, index):
+        return self.distances[index] if self.stamps[index] == self.generation else None
+
+    def next_step(self, index):
+        # One step down the gradient towards the root, or None at the root or outside the field
+        distance = self.distance_to(index)
+        if not distance:
+            return None
+        distances, stamps, generation, mask = self.distances, self.stamps, self.generation, self.pathfinder.masks[index]
+        for bit, step in self.pathfinder.steps:
+            neighbor = index + step
+            if mask & bit and stamps[neighbor] == generation and distances[neighbor] == distance - 1:
+                return neighbor
+        return None
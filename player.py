@@ -1,8 +1,14 @@
 from inventory import Inventory
+from progression import EXP_TABLE, MAX_LEVEL, PLAYER_STAT_CURVES, PLAYER_STAT_TABLES, stat_at_level
 import random
 from sound_manager import SoundManager
 
 class Player:
+    __slots__ = ('game_manager', 'sounds', 'x', 'y', 'current_room', 'in_combat', 'got_relic', 'name', 'level',
+                 'atk', 'defn', 'int', 'wis', 'con', 'eva', 'exp', 'hp', 'mp', 'max_hp', 'max_mp', 'inventory',
+                 'equipped_weapon', 'equipped_armor', 'has_map', 'has_compass', 'visibility_radius_changed',
+                 'visibility_radius', 'exp_requirements', 'previous_rooms')
+
     def __init__(self, start_room, game_manager, level=1):
         self.game_manager = game_manager
         self.sounds = SoundManager()
@@ -50,7 +56,7 @@ class Player:
         elif category == 'A':
             self.equipped_armor = item
             self.defn += self.get_armor_strength()
-        self.current_room.decorations.remove(item)
+        self.current_room.remove_decoration(item)
         self.sounds.play_sound('inventory', 0.75)
 
     def unequip_item(self, item, category):
@@ -60,45 +66,26 @@ class Player:
         elif category == 'A':
             self.equipped_armor = None
             self.defn -= int((self.defn * 3) // 5)
-        self.current_room.decorations.append(item)
+        self.current_room.add_decoration(item)
         self.sounds.play_sound('inventory', 0.75)
 
-    def calculate_stat_increase(self, current_stat, initial_value, max_value, current_level):
-        growth_rate = (max_value - initial_value) / 99  # Linear growth rate
-        expected_value = initial_value + growth_rate * (current_level - 1)
-        increase = expected_value - current_stat + random.randint(1, 3)
-        return int(max(1, min(max_value - current_stat, increase)))
+    def calculate_stat_increase(self, current_stat, stat, current_level):
+        max_value = PLAYER_STAT_CURVES[stat][1]
+        increase = stat_at_level(PLAYER_STAT_TABLES, stat, current_level) - current_stat + random.randint(1, 3)
+        return max(1, min(max_value - current_stat, increase))
 
     def level_up(self):
         self.level += 1
-        stat_increases = {
-            'hp': self.calculate_stat_increase(self.hp, 20, 999, self.level),
-            'mp': self.calculate_stat_increase(self.mp, 10, 999, self.level),
-            'atk': self.calculate_stat_increase(self.atk, 10, 255, self.level),
-            'defn': self.calculate_stat_increase(self.defn, 10, 255, self.level),
-            'int': self.calculate_stat_increase(self.int, 10, 255, self.level),
-            'wis': self.calculate_stat_increase(self.wis, 10, 255, self.level),
-            'con': self.calculate_stat_increase(self.con, 10, 255, self.level),
-            'eva': self.calculate_stat_increase(self.eva, 10, 255, self.level)
-        }
+        stat_increases = {stat: self.calculate_stat_increase(getattr(self, stat), stat, self.level) for stat in PLAYER_STAT_TABLES}
         for stat, increase in stat_increases.items():
             setattr(self, stat, getattr(self, stat) + increase)
         return stat_increases
     
     def calculate_exp_requirements(self):
-        base_exp = 50
-        target_exp_at_100 = 1000000
-        growth_factor = (target_exp_at_100 / base_exp) ** (1 / 98)
-        cumulative_exp = 0  # Initialize cumulative experience
-        self.exp_requirements = [cumulative_exp]
-        for lvl in range(1, self.level + 1):
-            next_exp = base_exp * (growth_factor ** (lvl - 1))
-            cumulative_exp += int(next_exp)  # Accumulate the experience required
-            self.exp_requirements.append(cumulative_exp)
+        self.exp_requirements = EXP_TABLE
 
     def check_level_up(self):
-        self.calculate_exp_requirements()
-        if self.level < 100 and self.exp >= self.exp_requirements[self.level]:
+        if self.level < MAX_LEVEL and self.exp >= self.exp_requirements[self.level]:
             print(f"We found the case for leveling successful; self.level is {self.level}, current exp is {self.exp}, and the requirements are {self.exp_requirements[self.level]}")
             return True
         return False
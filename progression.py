@@ -0,0 +1,49 @@
+MAX_LEVEL = 100
+MAX_LEVEL_OFFSET = 3  # Enemies spawn up to three levels above the player
+EXP_BASE = 50
+EXP_AT_MAX_LEVEL = 1000000
+# Stat: (value at level 1, value at MAX_LEVEL); growth between the two is linear
+ENEMY_STAT_CURVES = {'max_hp': (25, 1200), 'max_mp': (10, 999), 'atk': (10, 255), 'defn': (10, 255),
+                     'int': (10, 255), 'wis': (10, 255), 'con': (10, 255), 'eva': (10, 200)}
+PLAYER_STAT_CURVES = {'hp': (20, 999), 'mp': (10, 999), 'atk': (10, 255), 'defn': (10, 255),
+                      'int': (10, 255), 'wis': (10, 255), 'con': (10, 255), 'eva': (10, 255)}
+
+
+def build_exp_table():
+    # Cumulative experience needed to reach each level from 1, indexed by the level being left
+    growth_factor = (EXP_AT_MAX_LEVEL / EXP_BASE) ** (1 / 98)
+    cumulative_exp = 0
+    table = [cumulative_exp]
+    for lvl in range(1, MAX_LEVEL + 1):
+        cumulative_exp += int(EXP_BASE * (growth_factor ** (lvl - 1)))
+        table.append(cumulative_exp)
+    return tuple(table)
+
+
+def build_stat_table(initial_value, max_value):
+    # Whole part of the expected value at each level, capped at max_value; index 0 is unused. Levels past
+    # MAX_LEVEL are kept so enemies spawned above the player's level still read straight from the table
+    growth_rate = (max_value - initial_value) / 99
+    return tuple([initial_value] + [min(max_value, int(initial_value + growth_rate * (lvl - 1)))
+                                    for lvl in range(1, MAX_LEVEL + MAX_LEVEL_OFFSET + 1)])
+
+
+EXP_TABLE = build_exp_table()
+ENEMY_STAT_TABLES = {stat: build_stat_table(*curve) for stat, curve in ENEMY_STAT_CURVES.items()}
+PLAYER_STAT_TABLES = {stat: build_stat_table(*curve) for stat, curve in PLAYER_STAT_CURVES.items()}
+
+
+# Spawn rolls are randint(0, 100); a roll below the first bound that fits puts the enemy that many levels up
+LEVEL_OFFSET_ROLLS = ((6, 3), (17, 2), (33, 1))
+
+
+def determine_enemy_level(level_indicator, player_level):
+    for bound, offset in LEVEL_OFFSET_ROLLS:
+        if level_indicator < bound:
+            return player_level + offset
+    return player_level
+
+
+def stat_at_level(tables, stat, level):
+    table = tables[stat]
+    return table[min(level, len(table) - 1)]
@@ -1,101 +1,118 @@
 from collections import deque
+from grid_topology import DIRECTION_BITS
 import logging
 import math
-import random
 
 class RegionAssignment:
-    def __init__(self, map_instance, location_data):
+    def __init__(self, map_instance, lexicon):
         self.map_logger = logging.getLogger('map')
         self.map = map_instance
-        self.locations = location_data
+        self.zone_names = lexicon.zone_names
+        self.zone_quotas = lexicon.zone_quotas
+        self.rng = self.map.stage_rng('regions')
+        size = self.map.size
+        # Rooms are addressed by flat grid index y * size + x so every lookup below is a list access
+        self.size = size
+        self.steps = ((DIRECTION_BITS['n'], -size), (DIRECTION_BITS['s'], size), (DIRECTION_BITS['e'], 1), (DIRECTION_BITS['w'], -1))
+        self.neighbor_masks = self.map.topology.neighbor_masks().ravel().tolist()
+        self.regions = [None] * (size * size)
+        self.room_indices = [y * size + x for x, y in self.map.rooms]
         self.assign_regions()
         self.adjust_region_borders()
 
     def assign_regions(self):
-        unassigned_rooms = set(self.map.rooms.keys())
-        shuffled_regions = list(self.locations.items())
-        random.shuffle(shuffled_regions)
-
-        for region, data in shuffled_regions:
-            if data['total_zones'] > len(unassigned_rooms):
+        # Regions take their total_zones quotas in shuffled order until the rooms run out, the last one cut short.
+        # Those regions then grow at once from one shared frontier queue, a room at a time in turn, until each
+        # quota is used up; a region that gets boxed in is seeded again elsewhere
+        shuffled_regions = list(self.zone_quotas)
+        self.rng.shuffle(shuffled_regions)
+        quotas = {}
+        unclaimed = len(self.room_indices)
+        for region in shuffled_regions:
+            if not unclaimed:
+                break
+            quotas[region] = min(self.zone_quotas[region], unclaimed)
+            if quotas[region] < self.zone_quotas[region]:
                 self.map_logger.warning(f"Total zones for region {region} exceed unassigned rooms. Limiting to available rooms.")
-                data['total_zones'] = len(unassigned_rooms)
-
-            while unassigned_rooms and data['total_zones'] > 0:
-                start_pos = random.choice(list(unassigned_rooms))
-                grown_size = self.grow_region(start_pos, region, unassigned_rooms, data['total_zones'])
-                data['total_zones'] -= grown_size
-
-    def grow_region(self, start_pos, region, unassigned_rooms, max_size):
-        queue = deque([start_pos])
-        grown_size = 0
-
-        while queue and grown_size < max_size:
-            current_pos = queue.popleft()
-            if current_pos in unassigned_rooms:
-                self.assign_room(current_pos, region, unassigned_rooms)
-                grown_size += 1
+            unclaimed -= quotas[region]
+        seed_order = self.room_indices[:]
+        self.rng.shuffle(seed_order)
+        seed_cursor = 0
+        regions, masks, steps = self.regions, self.neighbor_masks, self.steps
+        active = [region for region in quotas if quotas[region] > 0]
+        while active:
+            frontier = deque()
+            for region in active:
+                while seed_cursor < len(seed_order) and regions[seed_order[seed_cursor]] is not None:
+                    seed_cursor += 1
+                if seed_cursor == len(seed_order):
+                    return
+                self.assign_room(seed_order[seed_cursor], region)
+                quotas[region] -= 1
+                frontier.append(seed_order[seed_cursor])
+            while frontier:
+                index = frontier.popleft()
+                region = regions[index]
+                mask = masks[index]
+                for bit, step in steps:
+                    if not quotas[region]:
+                        break
+                    if mask & bit and regions[index + step] is None:
+                        self.assign_room(index + step, region)
+                        quotas[region] -= 1
+                        frontier.append(index + step)
+            active = [region for region in active if quotas[region] > 0]
 
-                for neighbor_pos in self.get_adjacent_positions(current_pos):
-                    if neighbor_pos in unassigned_rooms:
-                        queue.append(neighbor_pos)
-
-        return grown_size
-
-    def assign_room(self, pos, region, unassigned_rooms):
-        room = self.map.rooms[pos]
+    def assign_room(self, index, region):
+        self.regions[index] = region
+        room = self.map.rooms[(index % self.size, index // self.size)]
         room.region = region
-        room.name = random.choice(self.locations[region]['zone_names'])
-        unassigned_rooms.remove(pos)
+        room.name = self.rng.choice(self.zone_names[region])
 
     def adjust_region_borders(self):
-        unassigned_rooms = {pos for pos, room in self.map.rooms.items() if room.region is None}
-        iteration_count = 0
-        while unassigned_rooms:
-            for pos in list(unassigned_rooms):
-                self.adjust_room_region(pos, unassigned_rooms)
-            iteration_count += 1
-            if iteration_count > len(self.map.rooms):
-                self.map_logger.warning("Infinite loop detected in adjust_region_borders. Breaking out of loop.")
-                break
+        # Rooms left over once the quotas ran out join the region most of their neighbours' neighbours belong to.
+        # A room with no assigned neighbour yet waits until one of them is assigned and puts it back on the worklist
+        regions, masks, steps = self.regions, self.neighbor_masks, self.steps
+        worklist = deque(index for index in self.room_indices if regions[index] is None)
+        while worklist:
+            index = worklist.popleft()
+            if regions[index] is not None:
+                continue
+            best_region = self.best_neighbor_region(index)
+            if best_region is None:
+                continue
+            self.assign_room(index, best_region)
+            mask = masks[index]
+            for bit, step in steps:
+                if mask & bit and regions[index + step] is None:
+                    worklist.append(index + step)
+        unassigned = sum(1 for index in self.room_indices if regions[index] is None)
+        if unassigned:
+            self.map_logger.warning(f"{unassigned} rooms have no region neighbour to join and stay unassigned.")
 
-    def adjust_room_region(self, pos, unassigned_rooms):
-        neighbors = self.get_adjacent_positions(pos)
+    def best_neighbor_region(self, index):
         best_region = None
         max_neighbors = 0
-        for neighbor_pos in neighbors:
-            neighbor_room = self.map.rooms.get(neighbor_pos)
-            if neighbor_room and neighbor_room.region:
-                count = self.count_region_neighbors(neighbor_pos, neighbor_room.region)
+        for neighbor_index in self.get_adjacent_indices(index):
+            region = self.regions[neighbor_index]
+            if region:
+                count = self.count_region_neighbors(neighbor_index, region)
                 if count > max_neighbors:
                     max_neighbors = count
-                    best_region = neighbor_room.region
-        if best_region:
-            room = self.map.rooms[pos]
-            room.region = best_region
-            room.name = random.choice(self.locations[best_region]['zone_names'])
-            unassigned_rooms.remove(pos)
+                    best_region = region
+        return best_region
+
+    def count_region_neighbors(self, index, region):
+        regions = self.regions
+        return sum(1 for neighbor_index in self.get_adjacent_indices(index) if regions[neighbor_index] == region)
 
-    def count_region_neighbors(self, pos, region):
-        count = 0
-        for neighbor_pos in self.get_adjacent_positions(pos):
-            neighbor_room = self.map.rooms.get(neighbor_pos)
-            if neighbor_room and neighbor_room.region == region:
-                count += 1
-        return count
+    def get_adjacent_indices(self, index):
+        mask = self.neighbor_masks[index]
+        return [index + step for bit, step in self.steps if mask & bit]
 
     def get_adjacent_positions(self, pos):
         x, y = pos
-        adjacent_positions = []
-        if (x, y - 1) in self.map.rooms:
-            adjacent_positions.append((x, y - 1))
-        if (x, y + 1) in self.map.rooms:
-            adjacent_positions.append((x, y + 1))
-        if (x + 1, y) in self.map.rooms:
-            adjacent_positions.append((x + 1, y))
-        if (x - 1, y) in self.map.rooms:
-            adjacent_positions.append((x - 1, y))
-        return adjacent_positions
+        return [(index % self.size, index // self.size) for index in self.get_adjacent_indices(y * self.size + x)]
 
     def visualize_map(self, map_instance):
         map_width, map_height = self.calculate_map_dimensions(map_instance)
@@ -0,0 +1,271 @@
+from collections import deque
+import heapq
+import logging
+
+CORRIDOR_WIDTH = 1  # Rings of neighbouring clusters the portal search may use beyond the coarse route
+CLUSTER_LIMIT = 256  # Big regions are cut into clusters of at most this many rooms so portal searches stay small
+
+
+class RegionPlanner:
+    # HPA*-style planning over regions. Each region splits into clusters, rooms of the region that reach each
+    # other without leaving it, grown up to CLUSTER_LIMIT rooms at a time. Portals are rooms connected into
+    # another cluster. A route is planned across clusters, then across the portals along that corridor, and
+    # only then filled in room by room from paths cached per cluster until its region's connections change
+    def __init__(self, game_map):
+        self.map_logger = logging.getLogger('map')
+        self.map = game_map
+        self.size = game_map.size
+        self.pathfinder = game_map.get_pathfinder()
+        cells = self.size * self.size
+        self.cluster_of = [-1] * cells
+        self.cluster_region = []
+        self.cluster_rooms = []
+        self.cluster_centres = []
+        self.cluster_portals = []
+        self.region_clusters = {}
+        self.portal_links = {}
+        self.cluster_links = []
+        self.portal_distances = {}
+        self.segment_paths = {}
+        self.plans = 0
+        self.abstract_expansions = 0
+        for region in game_map.rooms.region_names():
+            self.label_region(region)
+        for cluster in range(len(self.cluster_region)):
+            self.find_portals(cluster)
+        self.map_logger.debug(f"Region planner: {len(self.cluster_region)} clusters, {len(self.portal_links)} portals")
+
+    def room_index(self, room):
+        return room.y * self.size + room.x
+
+    def room_at(self, index):
+        return self.map.rooms[(index % self.size, index // self.size)]
+
+    def neighbors(self, index):
+        mask = self.pathfinder.masks[index]
+        return [index + step for bit, step in self.pathfinder.steps if mask & bit]
+
+    def label_region(self, region):
+        # Old clusters of the region are left empty rather than renumbered so other clusters keep their ids
+        for cluster in self.region_clusters.get(region, ()):
+            for portal in self.cluster_portals[cluster]:
+                self.portal_links.pop(portal, None)
+                self.portal_distances.pop(portal, None)
+            self.segment_paths.pop(cluster, None)
+            self.cluster_rooms[cluster] = []
+            self.cluster_links[cluster] = set()
+            self.cluster_portals[cluster] = []
+        clusters = []
+        cluster_of = self.cluster_of
+        rooms = self.map.rooms.region_indices(region)
+        regions, code = self.map.rooms.regions, self.map.rooms.string_codes.get(region)
+        for index in rooms:
+            cluster_of[index] = -1
+        for start in rooms:
+            if cluster_of[start] >= 0:
+                continue
+            cluster = len(self.cluster_region)
+            members = [start]
+            self.cluster_region.append(region)
+            self.cluster_rooms.append(members)
+            self.cluster_centres.append(None)
+            self.cluster_links.append(set())
+            self.cluster_portals.append([])
+            clusters.append(cluster)
+            cluster_of[start] = cluster
+            queue = deque([start])
+            while queue and len(members) < CLUSTER_LIMIT:
+                index = queue.popleft()
+                for neighbor in self.neighbors(index):
+                    if cluster_of[neighbor] < 0 and len(members) < CLUSTER_LIMIT and regions[neighbor] == code:
+                        cluster_of[neighbor] = cluster
+                        members.append(neighbor)
+                        queue.append(neighbor)
+            size = self.size
+            self.cluster_centres[cluster] = (sum(index % size for index in members) / len(members),
+                                             sum(index // size for index in members) / len(members))
+        self.region_clusters[region] = clusters
+        return clusters
+
+    def find_portals(self, cluster):
+        portals = []
+        cluster_links = self.cluster_links[cluster] = set()
+        for index in self.cluster_rooms[cluster]:
+            links = [neighbor for neighbor in self.neighbors(index) if self.cluster_of[neighbor] != cluster]
+            if links:
+                portals.append(index)
+                self.portal_links[index] = links
+                cluster_links.update(self.cluster_of[link] for link in links)
+            else:
+                self.portal_links.pop(index, None)
+            # Distances were only kept to the old set of portals; the paths between rooms are still good
+            self.portal_distances.pop(index, None)
+        self.cluster_portals[cluster] = portals
+
+    def search_cluster(self, start, stop=None):
+        # Breadth-first search that never leaves start's cluster, ending early once stop is reached
+        cluster = self.cluster_of[start]
+        cluster_of = self.cluster_of
+        distances, parents = {start: 0}, {start: -1}
+        queue = deque([start])
+        while queue:
+            index = queue.popleft()
+            if index == stop:
+                break
+            for neighbor in self.neighbors(index):
+                if neighbor not in distances and cluster_of[neighbor] == cluster:
+                    distances[neighbor] = distances[index] + 1
+                    parents[neighbor] = index
+                    queue.append(neighbor)
+        return distances, parents
+
+    def portal_search(self, portal):
+        # Only the distances to the other portals of the cluster are kept, not the whole search
+        distances = self.portal_distances.get(portal)
+        if distances is None:
+            reached = self.search_cluster(portal)[0]
+            distances = self.portal_distances[portal] = {other: reached[other] for other in self.cluster_portals[self.cluster_of[portal]]
+                                                         if other != portal and other in reached}
+        return distances
+
+    def segment(self, start, end):
+        cluster = self.cluster_of[start]
+        paths = self.segment_paths.setdefault(cluster, {})
+        path = paths.get((start, end))
+        if path is None:
+            path = paths[(start, end)] = self.walk_back(self.search_cluster(start, end)[1], end)
+        return path
+
+    def invalidate_region(self, region):
+        # Call once a region's connections change. Its clusters are rebuilt, and the clusters across its
+        # borders only have their portals rechecked; every other cached search stays valid
+        bordering = {self.cluster_of[link] for cluster in self.region_clusters.get(region, ())
+                     for portal in self.cluster_portals[cluster] for link in self.portal_links.get(portal, ())}
+        clusters = self.label_region(region)
+        for cluster in clusters:
+            for index in self.cluster_rooms[cluster]:
+                bordering.update(self.cluster_of[neighbor] for neighbor in self.neighbors(index))
+        for cluster in bordering.union(clusters):
+            if cluster >= 0:
+                self.find_portals(cluster)
+
+    def cluster_corridor(self, start_cluster, goal_cluster):
+        # The coarse plan: cheapest route between cluster centres, widened by CORRIDOR_WIDTH rings of
+        # neighbouring clusters so the portal search can still take a shortcut past the corridor's corners
+        centres = self.cluster_centres
+        goal_x, goal_y = centres[goal_cluster]
+        best = {start_cluster: 0}
+        came_from = {start_cluster: None}
+        heap = [(0, 0, start_cluster)]
+        while heap:
+            _, cost, cluster = heapq.heappop(heap)
+            if cluster == goal_cluster:
+                break
+            if cost > best[cluster]:
+                continue
+            x, y = centres[cluster]
+            for neighbor in self.cluster_links[cluster]:
+                neighbor_x, neighbor_y = centres[neighbor]
+                new_cost = cost + abs(neighbor_x - x) + abs(neighbor_y - y) + 1
+                if new_cost < best.get(neighbor, new_cost + 1):
+                    best[neighbor], came_from[neighbor] = new_cost, cluster
+                    heapq.heappush(heap, (new_cost + abs(neighbor_x - goal_x) + abs(neighbor_y - goal_y), new_cost, neighbor))
+        if goal_cluster not in came_from:
+            return None
+        corridor = set()
+        cluster = goal_cluster
+        while cluster is not None:
+            corridor.add(cluster)
+            cluster = came_from[cluster]
+        for _ in range(CORRIDOR_WIDTH):
+            corridor.update([neighbor for cluster in corridor for neighbor in self.cluster_links[cluster]])
+        return corridor
+
+    def plan(self, start_room, goal_room):
+        start, goal = self.room_index(start_room), self.room_index(goal_room)
+        self.plans += 1
+        start_distances, start_parents = self.search_cluster(start)
+        goal_distances, goal_parents = self.search_cluster(goal)
+        corridor = self.cluster_corridor(self.cluster_of[start], self.cluster_of[goal])
+        came_from = self.search_portals(start, goal, start_distances, goal_distances, corridor)
+        if came_from is None and corridor is not None:
+            came_from = self.search_portals(start, goal, start_distances, goal_distances, None)
+        if came_from is None:
+            return []
+        if came_from[-1] is None:
+            return self.rooms_along(self.walk_back(start_parents, goal))
+        portals = []
+        node = came_from[-1]
+        while node is not None:
+            portals.append(node)
+            node = came_from[node]
+        portals.reverse()
+        return self.rooms_along(self.refine(start, portals, goal, start_parents, goal_parents))
+
+    def search_portals(self, start, goal, start_distances, goal_distances, corridor):
+        # A* over portals kept inside the corridor; the goal itself is the node -1
+        cluster_of = self.cluster_of
+        goal_cluster = cluster_of[goal]
+        size = self.size
+        goal_x, goal_y = goal % size, goal // size
+        best = {}
+        came_from = {}
+        heap = []
+        if goal in start_distances:
+            # Staying inside the cluster is one candidate, but a loop through a neighbouring one can still be shorter
+            best[-1], came_from[-1] = start_distances[goal], None
+            heap.append((start_distances[goal], start_distances[goal], -1))
+        for portal in self.cluster_portals[cluster_of[start]]:
+            cost = start_distances[portal]
+            best[portal], came_from[portal] = cost, None
+            heapq.heappush(heap, (cost + abs(portal % size - goal_x) + abs(portal // size - goal_y), cost, portal))
+        while heap:
+            _, cost, portal = heapq.heappop(heap)
+            if portal == -1:
+                return came_from
+            if cost > best[portal]:
+                continue
+            self.abstract_expansions += 1
+            steps = [(link, 1) for link in self.portal_links[portal] if corridor is None or cluster_of[link] in corridor]
+            steps.extend(self.portal_search(portal).items())
+            if cluster_of[portal] == goal_cluster:
+                steps.append((-1, goal_distances[portal]))
+            for node, step_cost in steps:
+                new_cost = cost + step_cost
+                if new_cost < best.get(node, new_cost + 1):
+                    best[node], came_from[node] = new_cost, portal
+                    heuristic = abs(node % size - goal_x) + abs(node // size - goal_y) if node >= 0 else 0
+                    heapq.heappush(heap, (new_cost + heuristic, new_cost, node))
+        return None
+
+    def refine(self, start, portals, goal, start_parents, goal_parents):
+        # Concrete rooms after start up to goal, stitched from the cached paths inside each cluster
+        path = self.walk_back(start_parents, portals[0])
+        for current, following in zip(portals, portals[1:]):
+            if following in self.portal_links[current]:
+                path.append(following)
+            else:
+                path.extend(self.segment(current, following))
+        if portals[-1] != goal:
+            # goal_parents lead back to the goal, so that walk is turned round to end on the goal itself
+            walk = self.walk_back(goal_parents, portals[-1])
+            walk.reverse()
+            path.extend(walk[1:] + [goal])
+        return path
+
+    def walk_back(self, parents, index):
+        path = []
+        while parents[index] >= 0:
+            path.append(index)
+            index = parents[index]
+        path.reverse()
+        return path
+
+    def rooms_along(self, path):
+        return [self.room_at(index) for index in path]
+
+    def stats(self):
+        return {'clusters': sum(len(clusters) for clusters in self.region_clusters.values()),
+                'portals': len(self.portal_links), 'cached_portal_searches': len(self.portal_distances),
+                'cached_segments': sum(len(paths) for paths in self.segment_paths.values()),
+                'plans': self.plans, 'abstract_expansions': self.abstract_expansions}
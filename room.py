@@ -1,38 +1,267 @@
-import random
+from collections.abc import Mapping
+from grid_topology import RoomConnections
 import math
+import numpy as np
+import random
+import sys
+
+NO_STRING = 0  # String codes for None and "", the defaults of region and of the other text fields
+EMPTY_STRING = 1
+MAX_STRING_CODE = np.iinfo(np.uint16).max
+
+
+class RoomGrid(Mapping):
+    # Dict-shaped view of the rooms on a map, keyed by (x, y) and walked column by column like the grid was
+    # filled. Which cells hold a room is the topology's occupancy mask; every field of a room lives in an array
+    # here, strings as codes into one table. A room's only item is a code too, and just the few rooms holding
+    # several items or any enemies keep them in a dict
+    def __init__(self, game_map):
+        self.map = game_map
+        self.topology = game_map.topology
+        self.occupied = self.topology.occupied
+        self.size = game_map.size
+        cells = self.size * self.size
+        self.room_ids = np.zeros(cells, dtype=np.int32)
+        self.regions = np.zeros(cells, dtype=np.uint16)
+        self.names = np.full(cells, EMPTY_STRING, dtype=np.uint16)
+        self.atmos = np.full(cells, EMPTY_STRING, dtype=np.uint16)
+        self.colors = np.full(cells, EMPTY_STRING, dtype=np.uint16)
+        self.treasure = np.zeros(cells, dtype=bool)
+        self.targets = np.zeros(cells, dtype=bool)
+        self.decorations = np.zeros(cells, dtype=np.uint16)  # Code of the item lying in a room that holds just one
+        self.decoration_lists = {}  # Flat room index to the items lying there, for rooms holding more than one
+        self.enemies = {}  # Flat room index to the enemies standing there
+        self.strings = [None, ""]
+        self.string_codes = {None: NO_STRING, "": EMPTY_STRING}
+        self.count = 0
+
+    def code(self, value):
+        code = self.string_codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            if code > MAX_STRING_CODE:
+                raise ValueError(f"More than {code} distinct room strings on one map")
+            self.strings.append(value)
+            self.string_codes[value] = code
+        return code
+
+    def set_decorations(self, index, items):
+        items = tuple(items)
+        self.decorations[index] = self.code(items[0]) if len(items) == 1 else NO_STRING
+        if len(items) > 1:
+            self.decoration_lists[index] = items
+        else:
+            self.decoration_lists.pop(index, None)
+
+    def add(self, x, y, room_id):
+        index = y * self.size + x
+        if not self.occupied[y, x]:
+            self.count += 1
+        self.topology.add_room(x, y)
+        self.room_ids[index] = room_id
+        self.regions[index] = NO_STRING
+        self.names[index] = self.atmos[index] = self.colors[index] = EMPTY_STRING
+        self.treasure[index] = self.targets[index] = False
+        self.set_decorations(index, ())
+        self.enemies.pop(index, None)
+        return Room(self, x, y)
+
+    def add_many(self, indices, room_ids):
+        # Bulk add for restoring a map; the fields keep their defaults for the caller to fill in
+        self.occupied.reshape(-1)[indices] = True
+        self.room_ids[indices] = room_ids
+        self.count = int(self.occupied.sum())
+
+    def pop(self, pos, default=None):
+        if pos not in self:
+            return default
+        self.topology.remove_room(*pos)
+        self.count -= 1
+        return Room(self, *pos)
+
+    def __getitem__(self, pos):
+        x, y = pos
+        if 0 <= x < self.size and 0 <= y < self.size and self.occupied[y, x]:
+            return Room(self, x, y)
+        raise KeyError(pos)
+
+    def get(self, pos, default=None):
+        x, y = pos
+        if 0 <= x < self.size and 0 <= y < self.size and self.occupied[y, x]:
+            return Room(self, x, y)
+        return default
+
+    def __contains__(self, pos):
+        x, y = pos
+        return 0 <= x < self.size and 0 <= y < self.size and bool(self.occupied[y, x])
+
+    def __iter__(self):
+        # Views are made one at a time as the walk reaches them, never a whole map of them at once
+        xs, ys = np.nonzero(self.occupied.T)
+        return zip(xs.tolist(), ys.tolist())
+
+    def __len__(self):
+        return self.count
+
+    def region_names(self):
+        # Every region once, in the order a walk over the rooms first meets it
+        codes = self.regions.reshape(self.size, self.size).T[self.occupied.T]
+        _, first = np.unique(codes, return_index=True)
+        return [self.strings[code] for code in codes[np.sort(first)].tolist()]
+
+    def region_indices(self, region):
+        # Flat indices of the rooms in a region, in walk order
+        code = self.string_codes.get(region)
+        if code is None:
+            return []
+        xs, ys = np.nonzero(((self.regions.reshape(self.size, self.size) == code) & self.occupied).T)
+        return (ys * self.size + xs).tolist()
+
+    def nbytes(self):
+        arrays = (self.room_ids, self.regions, self.names, self.atmos, self.colors, self.treasure, self.targets,
+                  self.decorations)
+        lists = list(self.decoration_lists.values()) + list(self.enemies.values())
+        return (sum(array.nbytes for array in arrays) + sys.getsizeof(self.decoration_lists) + sys.getsizeof(self.enemies)
+                + sum(sys.getsizeof(items) for items in lists))
+
+    def string_bytes(self):
+        return sys.getsizeof(self.strings) + sys.getsizeof(self.string_codes)
+
 
 class Room:
-    def __init__(self, room_id, x, y, map):
-        self.map = map
-        self.room_id = room_id
+    # A view of one cell of the RoomGrid, made whenever a room is looked up. It holds no state of its own, so
+    # two views of the same cell are equal and a map costs its arrays however many rooms it has
+    __slots__ = ('grid', 'map', 'x', 'y', 'index')
+
+    def __init__(self, grid, x, y):
+        self.grid = grid
+        self.map = grid.map
         self.x = x
         self.y = y
-        self.region = None
-        self.name = ""
-        self.connections = {'n': None, 's': None, 'e': None, 'w': None}
-        self.lit = 0
-        self.has_treasure = False
-        self.decorations = []
-        self.enemies = []
-        self.parent = None
-        self.g = 0
-        self.h = 0
-        self.f = 0
-        self.atmo = ""
-        self.color = ""
-        self.is_target = False
-    
+        self.index = y * grid.size + x
+
+    def __eq__(self, other):
+        return isinstance(other, Room) and self.index == other.index and self.grid is other.grid
+
+    def __hash__(self):
+        return self.index
+
+    def __repr__(self):
+        return f"Room({self.x}, {self.y})"
+
+    @property
+    def room_id(self):
+        return int(self.grid.room_ids[self.index])
+
+    @property
+    def region(self):
+        return self.grid.strings[self.grid.regions[self.index]]
+
+    @region.setter
+    def region(self, region):
+        self.grid.regions[self.index] = self.grid.code(region)
+
+    @property
+    def name(self):
+        return self.grid.strings[self.grid.names[self.index]]
+
+    @name.setter
+    def name(self, name):
+        self.grid.names[self.index] = self.grid.code(name)
+
+    @property
+    def atmo(self):
+        return self.grid.strings[self.grid.atmos[self.index]]
+
+    @atmo.setter
+    def atmo(self, atmo):
+        self.grid.atmos[self.index] = self.grid.code(atmo)
+
+    @property
+    def color(self):
+        return self.grid.strings[self.grid.colors[self.index]]
+
+    @color.setter
+    def color(self, color):
+        self.grid.colors[self.index] = self.grid.code(color)
+
+    @property
+    def has_treasure(self):
+        return bool(self.grid.treasure[self.index])
+
+    @has_treasure.setter
+    def has_treasure(self, has_treasure):
+        self.grid.treasure[self.index] = has_treasure
+
+    @property
+    def is_target(self):
+        return bool(self.grid.targets[self.index])
+
+    @is_target.setter
+    def is_target(self, is_target):
+        self.grid.targets[self.index] = is_target
+
+    @property
+    def connections(self):
+        return RoomConnections(self)
+
+    @property
+    def lit(self):
+        # Light lives in one array on the map so it can be stamped and summed without visiting rooms
+        return int(self.map.light[self.y, self.x])
+
+    @lit.setter
+    def lit(self, level):
+        self.map.light[self.y, self.x] = level
+
+    @property
+    def decorations(self):
+        # A snapshot of the items lying here; they change through the setter, add_decoration and remove_decoration
+        code = self.grid.decorations[self.index]
+        if code:
+            return (self.grid.strings[code],)
+        return self.grid.decoration_lists.get(self.index, ())
+
+    @decorations.setter
+    def decorations(self, items):
+        self.grid.set_decorations(self.index, items)
+
+    def add_decoration(self, item):
+        self.grid.set_decorations(self.index, self.decorations + (item,))
+
+    def remove_decoration(self, item):
+        items = list(self.decorations)
+        items.remove(item)
+        self.grid.set_decorations(self.index, items)
+
+    @property
+    def enemies(self):
+        return self.grid.enemies.get(self.index, ())
+
+    def add_enemy(self, enemy):
+        self.grid.enemies.setdefault(self.index, []).append(enemy)
+
+    def remove_enemy(self, enemy):
+        enemies = self.grid.enemies[self.index]
+        enemies.remove(enemy)
+        if not enemies:
+            del self.grid.enemies[self.index]
+
     def connect(self, direction, room):
-        opposites = {'n': 's', 's': 'n', 'e': 'w', 'w': 'e'}
-        self.connections[direction] = room
-        room.connections[opposites[direction]] = self
+        self.map.topology.connect(self.x, self.y, direction)
+        self.map.connection_edited(self.x, self.y, direction)
 
     def euclidean_distance(self, room1, room2):
         return math.sqrt((room1.x - room2.x)**2 + (room1.y - room2.y)**2)
 
-    def get_random_distant_room(self):
+    def get_random_distant_room(self, attempts=64):
         distance_func = self.euclidean_distance
         min_distance = self.map.size // 2
+        # Probing random grid cells finds a far room in a few tries without listing every room on the map
+        for _ in range(attempts):
+            room = self.map.rooms.get((random.randrange(self.map.size), random.randrange(self.map.size)))
+            if room and distance_func(room, self) >= min_distance:
+                return room
         distant_rooms = [room for room in self.map.rooms.values()
                         if distance_func(room, self) >= min_distance]
         if distant_rooms:
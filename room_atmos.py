@@ -1,24 +1,23 @@
-import random
-
 class RoomAtmos:
     def __init__(self, map, data):
         self.map = map
+        self.rng = self.map.stage_rng('atmos')
         self.colors = data["adjectives"]["colors"]
         self.atmos = data["atmos"]
 
     def create_atmosphere(self):
-        colors = self.colors.copy()
-        atmos = self.atmos.copy()
-        random.shuffle(colors)
-        random.shuffle(atmos)
+        colors = list(self.colors)
+        atmos = list(self.atmos)
+        self.rng.shuffle(colors)
+        self.rng.shuffle(atmos)
         for room in self.map.rooms.values():
             if len(colors) == 0:
-                colors = self.colors.copy()
+                colors = list(self.colors)
             else:
                 color = colors[0]
                 colors.pop(0)
             if len(atmos) == 0:
-                atmos = self.atmos.copy()
+                atmos = list(self.atmos)
             else:
                 atmo = atmos[0]
                 atmos.pop(0)
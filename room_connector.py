@@ -1,17 +1,24 @@
-from collections import deque
+from disjoint_set import DisjointSet
 import logging
-import random
+from grid_topology import DIRECTION_BITS, DIRECTION_DELTAS
+from maze_generators import create_generator
 from room import Room
 
 class RoomConnector:
-    def __init__(self, map):
+    def __init__(self, map, generator=None):
         self.connector_logger = logging.getLogger('connector')
         self.map = map
-        self.connections = {}
         self.rooms = self.map.rooms
+        self.rng = self.map.stage_rng('connector')
+        self.generator = generator if generator is not None else create_generator('dfs')
+        # Components are tracked as connections go in, keyed by grid index y * size + x
+        self.components = DisjointSet(self.map.size * self.map.size)
+        self.joined_components = 0
+        self.removed_rooms = 0
         self.establish_initial_connections()
         self.ensure_connectivity()
         self.remove_invalid_connections()
+        self.connector_logger.info(f"Connectivity: {self.component_stats()}")
 
     def get_adjacent_room(self, room, direction):
         if isinstance(room, Room):
@@ -32,32 +39,22 @@ class RoomConnector:
                 neighbors[direction] = self.rooms[adjacent_pos]
         return neighbors.values()
     
-    def get_potential_connections(self, room):
+    def get_potential_connections(self, room, neighbor_mask=None):
+        if neighbor_mask is None:
+            neighbor_mask = self.map.topology.neighbor_mask(room.x, room.y)
+        open_mask = neighbor_mask & ~room.connections.mask()
         potential_connections = []
         for direction in ['n', 's', 'e', 'w']:
-            if not room.connections[direction]:
-                adjacent_room = self.get_adjacent_room(room, direction)
-                if adjacent_room:
-                    potential_connections.append((adjacent_room, direction))
+            if open_mask & DIRECTION_BITS[direction]:
+                potential_connections.append((self.get_adjacent_room(room, direction), direction))
         return potential_connections
 
     def establish_initial_connections(self):
-        start = next(iter(self.rooms.values()))  # Start from any room
-        self.randomized_dfs(start, None, 0)
-
-    def randomized_dfs(self, current_room, previous_direction, straight_path_count, visited=None):
-        if visited is None:
-            visited = set()
-        visited.add(current_room)
-        directions = ['n', 'e', 's', 'w']
-        random.shuffle(directions)  # Randomize the direction order
-        for direction in directions:
-            next_room = self.get_adjacent_room(current_room, direction)
-            if next_room and next_room not in visited:
-                new_straight_path_count = straight_path_count + 1 if direction == previous_direction else 0
-                if new_straight_path_count <= 4:
-                    self.establish_connection(current_room, next_room)
-                    self.randomized_dfs(next_room, direction, new_straight_path_count, visited)
+        edges = self.generator.generate(self.rooms.keys(), self.map.size, self.map.size)
+        self.connector_logger.debug(f"{self.generator.name} generator carved {len(edges)} connections for {len(self.rooms)} rooms")
+        for pos, direction in edges:
+            room = self.rooms[pos]
+            self.establish_connection(room, self.get_adjacent_room(room, direction))
 
     def establish_connection(self, room1, room2):
         direction = None
@@ -76,85 +73,85 @@ class RoomConnector:
             else:
                 direction, opposite_direction = 'w', 'e'
         if direction and opposite_direction:
-            self.connections.setdefault(room1.room_id, {})[direction] = room2.room_id
-            self.connections.setdefault(room2.room_id, {})[opposite_direction] = room1.room_id
             room1.connect(direction, room2)
-            room2.connect(opposite_direction, room1)
+            self.components.union(self.component_key(room1), self.component_key(room2))
         self.connector_logger.debug(f"Established connection between room {room1.room_id} and {room2.room_id}")
 
-    def find_nearest_connected_room(self, unconnected_room):
-        self.connector_logger.debug(f"Finding nearest connected room for unconnected room ID {unconnected_room.room_id}")
-        queue = deque([unconnected_room])
-        visited = set([unconnected_room])
-        while queue:
-            current_room = queue.popleft()
-            for neighbor in self.get_adjacent_rooms(current_room):
-                if neighbor in visited or neighbor is None:
-                    continue
-                if neighbor in self.rooms.values():
-                    self.connector_logger.debug(f"Nearest connected room for room ID {unconnected_room.room_id} is {neighbor.room_id}")
-                    return neighbor
-                visited.add(neighbor)
-                queue.append(neighbor)
-        self.connector_logger.warning(f"No connected room found for room ID {unconnected_room.room_id}")
-        return None
+    def component_key(self, room):
+        return room.y * self.map.size + room.x
+
+    def component_roots(self):
+        find = self.components.find
+        return {pos: find(self.component_key(room)) for pos, room in self.rooms.items()}
+
+    def component_sizes(self, roots=None):
+        sizes = {}
+        for root in (roots or self.component_roots()).values():
+            sizes[root] = sizes.get(root, 0) + 1
+        return sizes
 
     def ensure_connectivity(self):
-        start = next(iter(self.rooms.values()))
-        visited = set()
-        queue = deque([start])
+        roots = self.component_roots()
+        sizes = self.component_sizes(roots)
+        if len(sizes) > 1:
+            main_root = max(sizes, key=sizes.get)
+            self.join_components([pos for pos, root in roots.items() if root != main_root])
+            find = self.components.find
+            main_root = find(main_root)
+            # Whatever could not be joined sits on an island cut off by the irregular outline
+            self.remove_unconnected_rooms([pos for pos, root in roots.items() if root != main_root and find(root) != main_root])
 
-        while queue:
-            current_room = queue.popleft()
-            if current_room not in visited:
-                visited.add(current_room)
-                for direction, next_room in current_room.connections.items():
-                    if next_room and next_room not in visited:
-                        queue.append(next_room)
-        for room in self.rooms.values():
-            if room not in visited:
-                nearest_connected_room = self.find_nearest_connected_room(room)
-                if nearest_connected_room:
-                    self.establish_connection(room, nearest_connected_room)
-                    queue.append(room)  # Add room to queue for BFS
-                    visited.add(room)  # Mark room as visited
-        self.remove_unconnected_rooms()
-        assert len(visited) == len(self.rooms), "Map is still not fully connected."
+    def join_components(self, stray_positions):
+        # Kruskal over the grid edges that leave the stray components, cheapest edge first. An edge
+        # costs the combined degree of its rooms so joins avoid turning rooms into crossroads.
+        find = self.components.find
+        degrees = self.map.topology.degrees()
+        candidates = []
+        for x, y in stray_positions:
+            room = self.rooms[(x, y)]
+            for direction, (dx, dy) in DIRECTION_DELTAS.items():
+                neighbor = self.rooms.get((x + dx, y + dy))
+                if neighbor and find(self.component_key(room)) != find(self.component_key(neighbor)):
+                    candidates.append((int(degrees[y, x]) + int(degrees[y + dy, x + dx]), room, neighbor))
+        candidates.sort(key=lambda candidate: candidate[0])
+        for _, room, neighbor in candidates:
+            if find(self.component_key(room)) != find(self.component_key(neighbor)):
+                self.establish_connection(room, neighbor)
+                self.joined_components += 1
 
-    def dfs(self, room, visited):
-        if room in visited:
-            return
-        visited.add(room)
-        for direction, next_room in room.connections.items():
-            if next_room in self.rooms and next_room not in visited:
-                if not isinstance(next_room, Room):
-                    self.connector_logger.error(f"dfs: next_room is not a Room object: {next_room}")
-                    continue
-                self.dfs(next_room, visited)
+    def component_stats(self):
+        sizes = sorted(self.component_sizes().values(), reverse=True)
+        return {
+            'rooms': len(self.rooms),
+            'components': len(sizes),
+            'largest_component': sizes[0] if sizes else 0,
+            'smallest_component': sizes[-1] if sizes else 0,
+            'joined_components': self.joined_components,
+            'removed_rooms': self.removed_rooms
+        }
 
     def remove_invalid_connections(self):
-        for room in self.rooms.values():
-            for direction in list(room.connections.keys()):
-                connected_room = room.connections[direction]
-                if connected_room not in self.rooms.values():
-                    room.connections[direction] = None
+        # A connection may only point at a room that exists
+        topology = self.map.topology
+        topology.connections &= topology.neighbor_masks()
 
     def clear_remaining_dead_ends(self):
-            dead_end_rooms = [room for room in self.rooms.values() if sum(1 for conn in room.connections.values() if conn) == 1]
+            topology = self.map.topology
+            dead_end_rooms = [self.rooms[pos] for pos in topology.dead_ends()]
             self.connector_logger.debug(f"Starting dead end count is {len(dead_end_rooms)}")
             # Filter out rooms with key items
-            rooms_with_key_items = self.map.rooms_with_keys
+            rooms_with_key_items = set(self.map.rooms_with_keys)
             dead_end_rooms = [room for room in dead_end_rooms if room not in rooms_with_key_items]
+            neighbor_masks = topology.neighbor_masks().tolist()
             for room in dead_end_rooms:
-                potential_connections = self.get_potential_connections(room)
+                potential_connections = self.get_potential_connections(room, neighbor_masks[room.y][room.x])
                 if potential_connections:
-                    new_connection, _ = random.choice(potential_connections)  # Unpack the tuple
+                    new_connection, _ = self.rng.choice(potential_connections)  # Unpack the tuple
                     self.establish_connection(room, new_connection)
-            dead_end_rooms = [room for room in self.rooms.values() if sum(1 for conn in room.connections.values() if conn) == 1]
-            self.connector_logger.debug(f"Ending dead end count is {len(dead_end_rooms)}")
+            self.connector_logger.debug(f"Ending dead end count is {len(topology.dead_ends())}")
 
-    def remove_unconnected_rooms(self):
-        unconnected_rooms = [room_id for room_id, room in self.rooms.items() if not room.connections]
+    def remove_unconnected_rooms(self, unconnected_rooms):
         for room_id in unconnected_rooms:
             self.connector_logger.info(f"Removing unconnected room: {room_id}")
-            del self.rooms[room_id]
\ No newline at end of file
+            self.map.remove_room(room_id)
+            self.removed_rooms += 1
\ No newline at end of file
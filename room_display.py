@@ -1,4 +1,4 @@
-import json
+from lexicon import get_lexicon
 import pygame
 import random
 
@@ -13,14 +13,10 @@ class RoomDisplay:
         self.to_render = []
 
     def load_colors(self):
-            with open('words.json') as file:
-                data = json.load(file)
-            return data["adjectives"]["colors"]
+            return get_lexicon().adjectives["colors"]
     
     def load_atmos(self):
-            with open('words.json') as file:
-                data = json.load(file)
-            return data["atmos"]
+            return get_lexicon().atmos
 
     def wrap_text(self, text, max_width):
         words = text.split(' ')
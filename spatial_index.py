@@ -0,0 +1,50 @@
+class SpatialIndex:
+    # Uniform grid of buckets over room coordinates, plus the set of occupied rooms, kept up to date as
+    # entities move so lookups cost in proportion to what they find rather than to the number of entities
+    def __init__(self, cell_size=8):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.rooms = {}
+
+    def cell_key(self, x, y):
+        return x // self.cell_size, y // self.cell_size
+
+    def add(self, entity):
+        self.cells.setdefault(self.cell_key(entity.x, entity.y), []).append(entity)
+        self.rooms.setdefault((entity.x, entity.y), []).append(entity)
+
+    def remove(self, entity, x=None, y=None):
+        # x and y default to where the entity is now; pass its old position if it has already moved
+        x = entity.x if x is None else x
+        y = entity.y if y is None else y
+        for table, key in ((self.cells, self.cell_key(x, y)), (self.rooms, (x, y))):
+            bucket = table.get(key)
+            if bucket and entity in bucket:
+                bucket.remove(entity)
+                if not bucket:
+                    del table[key]
+
+    def move(self, entity, old_x, old_y):
+        self.remove(entity, old_x, old_y)
+        self.add(entity)
+
+    def in_room(self, x, y):
+        return self.rooms.get((x, y), ())
+
+    def occupied_rooms(self):
+        return self.rooms.keys()
+
+    def within_box(self, x, y, half_width):
+        # Everything within half_width rooms on both axes
+        cell_size = self.cell_size
+        for cell_x in range((x - half_width) // cell_size, (x + half_width) // cell_size + 1):
+            for cell_y in range((y - half_width) // cell_size, (y + half_width) // cell_size + 1):
+                for entity in self.cells.get((cell_x, cell_y), ()):
+                    if abs(entity.x - x) <= half_width and abs(entity.y - y) <= half_width:
+                        yield entity
+
+    def within_radius(self, x, y, radius):
+        radius_squared = radius * radius
+        for entity in self.within_box(x, y, int(radius)):
+            if (entity.x - x) ** 2 + (entity.y - y) ** 2 <= radius_squared:
+                yield entity
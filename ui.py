@@ -1,5 +1,5 @@
 from combat import Combat
-import json
+from lexicon import get_lexicon
 import logging
 import pygame
 from message_display import MessageDisplay
@@ -100,20 +100,7 @@ class UI:
         self.screen.blit(surface, (0, self.message_display_bottom))
 
     def parse_item_categories(self):
-        category_map = {}
-        with open('words.json', 'r') as file:
-            data = json.load(file)
-            for category, items in data["objects"].items():
-                for item in items:
-                    if category == "tools":
-                        category_map[item] = 'T'
-                    elif category == "weapons":
-                        category_map[item] = 'W'
-                    elif category == "armor":
-                        category_map[item] = 'A'
-                    elif category == "artifacts":
-                        category_map[item] = 'K'
-        return category_map
+        return get_lexicon().item_categories
 
     def update_ui(self):
         lower_ui_surface = pygame.Surface((self.window_width // 2, self.window_height // 4))
@@ -135,7 +122,7 @@ class UI:
         stats_surface.fill((50, 50, 50))
         first_column_attributes = ['name', 'level', 'hp', 'mp', 'exp']
         second_column_attributes = ['atk', 'defn', 'int', 'wis', 'con', 'eva']
-        third_column_attributes = ['region', 'name', 'x', 'perc_lit']
+        third_column_attributes = ['region', 'name', 'x', 'perc_lit', 'explored']
         quarter_width = (self.window_width // 2) // 4
         offsets = [quarter_width * (i + 1) - (quarter_width // 2) for i in range(4)]
         text_color = (144, 236, 144)  # Consistent text color
@@ -166,9 +153,14 @@ class UI:
                 player_attr_x = getattr(self.player.current_room, attr, 'N/A')
                 player_attr_y = getattr(self.player.current_room, 'y', 'N/A')
                 return f"Coords: ({player_attr_x}, {player_attr_y})"
-            else: # attr == perc_lit
+            elif attr == 'perc_lit':
                 perc_lit = self.game_manager.map_visualizer.calculate_percent_lit()
                 return f"Map Lit %: {perc_lit:.2f}"
+            else: # attr == explored
+                exploration = self.game_manager.map_visualizer.exploration
+                region = exploration.region_coverage(self.player.current_room.region)
+                region_text = f", region {region['percent_explored']:.0f}%" if region else ""
+                return f"Explored: {len(exploration)}/{len(self.game_manager.game_map.rooms)}{region_text}"
 
         render_text_for_column(third_column_attributes, offsets[2], get_third_column_text)
 
@@ -272,7 +264,8 @@ class UI:
         for item, rect in self.inventory_item_rects:
             if rect.collidepoint(adjusted_mouse_pos):
                 self.player.inventory.remove_item(item)
-                self.player.current_room.decorations.append(item)
+                self.player.current_room.add_decoration(item)
+                self.game_manager.map_visualizer.room_items_changed(self.player.current_room)
                 self.message_display.add_message(f"You dropped the {item} on the ground.")
                 self.room_display.player_inventory_change = True
                 self.room_display.display_room_info(self.screen)
@@ -281,10 +274,8 @@ class UI:
     def set_middle_button_text(self):
         new_state = None
         # Check for enemies
-        for enemy in self.game_manager.enemy_manager.enemies:
-            if enemy.current_room == self.game_manager.player.current_room and enemy in self.game_manager.enemy_manager.enemies:
-                new_state = "enemy"
-                break
+        if self.game_manager.enemy_manager.enemies_in_room(self.game_manager.player.current_room):
+            new_state = "enemy"
         # Check for items only if no enemy is found
         if new_state is None:
             for item in self.game_manager.player.current_room.decorations:
@@ -309,7 +300,8 @@ class UI:
     def handle_middle_button_click(self):
         if self.middle_button_label == "Attack":
             self.game_manager.is_combat = True
-            self.game_manager.combat = Combat(self.player, True, self.game_manager.enemy_manager, self.message_display)
+            self.game_manager.combat = Combat(self.player, True, self.game_manager.enemy_manager, self.message_display,
+                                              self.game_manager.auto_resolve, self.game_manager.combat_pace)
         
         if self.middle_button_label == "Pick Up":
             for item in self.player.current_room.decorations:
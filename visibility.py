@@ -0,0 +1,66 @@
+from lighting import MAX_LIGHT_LEVEL
+import numpy as np
+
+
+class VisibilityCache:
+    # Field of view that follows connections instead of a straight disc: light spreads from a room through
+    # open doorways, dimming by one level per room walked, for up to radius rooms. Each (room, radius) is
+    # searched once and kept until the connections of a room it reached change; Map.connections_changed,
+    # called whenever a room's connections are edited, passes the rooms on
+    def __init__(self, game_map):
+        self.pathfinder = game_map.get_pathfinder()
+        self.size = game_map.size
+        self.views = {}
+        self.rooms_seen_by = {}  # Room index to the cached views that reach it
+        self.searches = 0
+        self.hits = 0
+        self.invalidated = 0
+
+    def view(self, x, y, radius):
+        # Flat room indices in view and their light levels, nearest first
+        key = (y * self.size + x, radius)
+        view = self.views.get(key)
+        if view is None:
+            view = self.views[key] = self.search(key[0], radius)
+            for index in view[0].tolist():
+                self.rooms_seen_by.setdefault(index, set()).add(key)
+        else:
+            self.hits += 1
+        return view
+
+    def search(self, start, radius):
+        self.searches += 1
+        masks, steps = self.pathfinder.masks, self.pathfinder.steps
+        indices, levels = [start], [MAX_LIGHT_LEVEL]
+        seen = {start}
+        frontier = [start]
+        for distance in range(1, radius + 1):
+            next_frontier = []
+            for index in frontier:
+                mask = masks[index]
+                for bit, step in steps:
+                    neighbor = index + step
+                    if mask & bit and neighbor not in seen:
+                        seen.add(neighbor)
+                        next_frontier.append(neighbor)
+            level = max(1, MAX_LIGHT_LEVEL - distance)
+            indices.extend(next_frontier)
+            levels.extend([level] * len(next_frontier))
+            frontier = next_frontier
+        return np.array(indices, dtype=np.intp), np.array(levels, dtype=np.uint8)
+
+    def invalidate(self, rooms):
+        # Every view that reached one of these rooms may now reach further or less far
+        for room in rooms:
+            for key in self.rooms_seen_by.pop(room.y * self.size + room.x, ()):
+                view = self.views.pop(key, None)
+                if view is None:
+                    continue
+                self.invalidated += 1
+                for index in view[0].tolist():
+                    keys = self.rooms_seen_by.get(index)
+                    if keys is not None:
+                        keys.discard(key)
+
+    def stats(self):
+        return {'views': len(self.views), 'searches': self.searches, 'hits': self.hits, 'invalidated': self.invalidated}